@@ -1,11 +1,10 @@
 import bpy
 
 from .config import __addon_name__
-from .i18n.dictionary import dictionary
 from ...common.class_loader import auto_load
 from ...common.class_loader.auto_load import add_properties, remove_properties
-from ...common.i18n.dictionary import common_dictionary
-from ...common.i18n.i18n import load_dictionary
+from ...common.i18n.i18n import load_translations, register_translations, unregister_translations, \
+    subscribe_language_change, unsubscribe_language_change
 
 # Add-on info
 bl_info = {
@@ -40,15 +39,17 @@ def register():
     add_properties(_addon_properties)
 
     # Internationalization
-    load_dictionary(dictionary)
-    bpy.app.translations.register(__addon_name__, common_dictionary)
+    load_translations(__package__ + ".i18n")
+    subscribe_language_change()
+    register_translations(__addon_name__)
 
     print("{} addon is installed.".format(__addon_name__))
 
 
 def unregister():
     # Internationalization
-    bpy.app.translations.unregister(__addon_name__)
+    unregister_translations(__addon_name__)
+    unsubscribe_language_change()
     # unRegister classes
     auto_load.unregister()
     remove_properties(_addon_properties)
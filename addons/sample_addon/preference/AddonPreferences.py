@@ -27,6 +27,12 @@ class ExampleAddonPreferences(AddonPreferences):
         name="Boolean Config",
         default=False,
     )
+    # read by auto_load when the addon is enabled, see common/class_loader/registration_timing.py
+    registration_timing: BoolProperty(
+        name="Print Registration Timing",
+        description="Print how long each module import and class registration takes when the addon is enabled",
+        default=False,
+    )
 
     def draw(self, context: bpy.types.Context):
         layout = self.layout
@@ -34,3 +40,4 @@ class ExampleAddonPreferences(AddonPreferences):
         layout.prop(self, "filepath")
         layout.prop(self, "number")
         layout.prop(self, "boolean")
+        layout.prop(self, "registration_timing")
@@ -1,5 +1,8 @@
 import importlib
+import importlib.util
 import inspect
+import json
+import os
 import pkgutil
 import typing
 from pathlib import Path
@@ -10,41 +13,69 @@ __all__ = (
     "init",
     "register",
     "unregister",
+    "reload_modules",
     "add_properties",
     "remove_properties",
 )
 
+from .dependency_sort import sort_by_dependencies
+from .lazy_operator import get_lazy_modules, get_lazy_operators
+from .registration_timing import TIMING_ENV_VAR, TimingReport
 from ..types.framework import ExpandableUi, is_extension
 
 blender_version = bpy.app.version
 
+# generated by the framework when releasing the addon, keep in sync with framework.py
+REGISTRATION_MANIFEST_FILE = "registration_manifest.json"
+REGISTRATION_MANIFEST_VERSION = 1
+
 modules = None
 ordered_classes = None
 frame_work_classes = None
+# wall time of the imports and registrations of the last init() and register(), see registration_timing.py
+timing_report = TimingReport()
 
 
 def init():
     global modules
     global ordered_classes
     global frame_work_classes
+    global timing_report
+    timing_report = TimingReport()
     # notice here, the path root is the root of the project
-    modules = get_all_submodules(Path(__file__).parent.parent.parent)
+    root_path = Path(__file__).parent.parent.parent
+    # use the registration manifest generated at release time if there is one, otherwise discover the classes
+    manifest = load_registration_manifest(root_path)
+    if manifest is not None:
+        try:
+            modules, ordered_classes, frame_work_classes = get_registration_from_manifest(root_path, manifest)
+            return
+        except (ImportError, AttributeError, KeyError, TypeError) as e:
+            print("Invalid registration manifest, discover the classes to register instead:", e)
+    modules = get_all_submodules(root_path)
     ordered_classes = get_ordered_classes_to_register(modules)
     frame_work_classes = get_framework_classes(modules)
 
 
 def register():
     for cls in ordered_classes:
-        bpy.utils.register_class(cls)
+        with timing_report.measure("register_class", cls.__qualname__):
+            bpy.utils.register_class(cls)
 
     for module in modules:
         if module.__name__ == __name__:
             continue
         if hasattr(module, "register"):
-            module.register()
+            with timing_report.measure("register", module.__name__):
+                module.register()
 
     for cls in frame_work_classes:
-        register_framework_class(cls)
+        with timing_report.measure("register_framework_class", cls.__qualname__):
+            register_framework_class(cls)
+
+    if is_timing_enabled():
+        print(f"Registration timing of {get_addon_package()}:")
+        print(timing_report.to_json() if os.environ.get(TIMING_ENV_VAR) == "json" else timing_report.format_table())
 
 def unregister():
     for cls in reversed(ordered_classes):
@@ -60,20 +91,158 @@ def unregister():
         unregister_framework_class(cls)
 
 
+# attributes set by the import system, kept when a module is reloaded
+_MODULE_ATTRIBUTES = {"__name__", "__loader__", "__spec__", "__package__", "__path__", "__file__", "__cached__",
+                      "__builtins__"}
+
+
+def reload_module(module):
+    """
+    Reload module in place. importlib.reload keeps the names the new source no longer defines, they are removed first so
+    the module is the same as after a full reload, e.g. a deleted class is gone.
+    重新加载模块前先清除其定义的名称 避免源码中删除的类或函数依然存在
+    """
+    for name in list(vars(module)):
+        if name not in _MODULE_ATTRIBUTES:
+            delattr(module, name)
+    module.__doc__ = None
+    return importlib.reload(module)
+
+
+def reload_modules(module_names) -> bool:
+    """
+    Reload only the given modules and re-register the classes defined in them, together with the classes that depend
+    on them for registration. module_names must contain every module importing a reloaded module, and list the
+    imported modules before the modules importing them, they are reloaded in this order.
+    Returns False if the whole addon has to be reloaded instead: a package is changed, a module auto_load did not load
+    now has something to register, or the registration order (the registered classes, their dependencies or
+    _reg_order) is changed.
+    After returning False or raising, the classes and modules which are still registered are the ones auto_load
+    unregisters, so the addon can be disabled as usual.
+    只重新加载给定的模块并重新注册受影响的类，若注册顺序发生变化则返回False，需要重新加载整个插件
+    """
+    global modules
+    global ordered_classes
+    global frame_work_classes
+    # module name -> module, in reload order
+    old_modules = {module_name: importlib.import_module(module_name) for module_name in module_names}
+    module_names = set(old_modules)
+    # packages run code of the addon itself when imported, they are not reloaded alone
+    if __name__ in module_names or any(hasattr(module, "__path__") for module in old_modules.values()):
+        return False
+
+    old_deps_dict = get_register_deps_dict_of_classes(set(ordered_classes))
+    old_signature = get_registration_signature(old_deps_dict)
+    # classes defined in the reloaded modules and the classes depending on them
+    affected_classes = {cls for cls in ordered_classes if cls.__module__ in module_names}
+    changed = True
+    while changed:
+        dependents = {cls for cls, deps in old_deps_dict.items() if not deps.isdisjoint(affected_classes)}
+        changed = not dependents <= affected_classes
+        affected_classes |= dependents
+    reloaded_modules = [module for module in modules if module.__name__ in module_names]
+    reloaded_framework_classes = {cls for cls in frame_work_classes if cls.__module__ in module_names}
+
+    for cls in reversed(ordered_classes):
+        if cls in affected_classes:
+            bpy.utils.unregister_class(cls)
+    ordered_classes = [cls for cls in ordered_classes if cls not in affected_classes]
+    for module in reloaded_modules:
+        if hasattr(module, "unregister"):
+            module.unregister()
+    modules = [module for module in modules if module.__name__ not in module_names]
+    for cls in reloaded_framework_classes:
+        unregister_framework_class(cls)
+    frame_work_classes = frame_work_classes - reloaded_framework_classes
+
+    # a module is reloaded after the modules it imports, so it picks up their new classes and functions
+    importlib.invalidate_caches()
+    new_modules = [reload_module(module) for module in old_modules.values()]
+    # modules auto_load did not load (e.g. not listed in the registration manifest) must still have nothing to register
+    for module in new_modules:
+        if module not in reloaded_modules:
+            if hasattr(module, "register") or hasattr(module, "unregister") or get_framework_classes([module]):
+                return False
+
+    # the dependents defined in the other modules are registered again as they are
+    kept_classes = {cls for cls in affected_classes if cls.__module__ not in module_names}
+    new_classes = set(ordered_classes) | kept_classes
+    new_classes |= {cls for cls in iter_my_classes(new_modules) if cls.__module__ in module_names}
+    new_deps_dict = get_register_deps_dict_of_classes(new_classes)
+    if get_registration_signature(new_deps_dict) != old_signature:
+        return False
+
+    new_ordered_classes = toposort(new_deps_dict)
+    registered_classes = set(ordered_classes)
+    for cls in new_ordered_classes:
+        if cls not in registered_classes:
+            bpy.utils.register_class(cls)
+    ordered_classes = new_ordered_classes
+    modules = sorted(modules + reloaded_modules, key=lambda module: module.__name__)
+    for module in reloaded_modules:
+        if hasattr(module, "register"):
+            module.register()
+    new_framework_classes = get_framework_classes(reloaded_modules) - frame_work_classes
+    for cls in new_framework_classes:
+        register_framework_class(cls)
+    frame_work_classes = frame_work_classes | new_framework_classes
+    return True
+
+
+# Registration timing
+#################################################
+
+def get_addon_package():
+    # this file is common/class_loader/auto_load.py of the addon
+    return __package__.rsplit(".", 2)[0]
+
+
+def is_timing_enabled():
+    # the environment variable, or a registration_timing property in the addon preferences
+    if os.environ.get(TIMING_ENV_VAR):
+        return True
+    addon = bpy.context.preferences.addons.get(get_addon_package())
+    preferences = getattr(addon, "preferences", None)
+    return bool(getattr(preferences, "registration_timing", False))
+
+
 # Import modules
 #################################################
 
 def get_all_submodules(directory):
-    return list(iter_submodules(directory))
+    modules = list(iter_submodules(directory))
+    # implementation modules of lazy operators declared after the modules were imported, they are not loaded either
+    lazy_modules = get_lazy_modules()
+    return [module for module in modules if module.__name__ not in lazy_modules]
 
 
 def iter_submodules(path):
     import_as_extension = is_extension()
     for name in sorted(iter_submodule_names(path)):
-        if import_as_extension:
-            yield importlib.import_module("..." + name, __package__)
-        else:
-            yield importlib.import_module("." + name, path.name)
+        # the implementation modules of lazy operators are only imported when the operators are used
+        if is_lazy_submodule(path, name, import_as_extension):
+            continue
+        with timing_report.measure("import", name):
+            module = import_submodule(path, name, import_as_extension)
+        yield module
+
+
+def import_submodule(path, name, import_as_extension):
+    if import_as_extension:
+        return importlib.import_module("..." + name, __package__)
+    else:
+        return importlib.import_module("." + name, path.name)
+
+
+def is_lazy_submodule(path, name, import_as_extension):
+    if import_as_extension:
+        full_name = importlib.util.resolve_name("..." + name, __package__)
+    else:
+        full_name = path.name + "." + name
+    # importing the module would import its package first anyway, the lazy operators declared in the __init__.py of
+    # the package are known after that
+    importlib.import_module(full_name.rpartition(".")[0])
+    return full_name in get_lazy_modules()
 
 
 def iter_submodule_names(path, root=""):
@@ -86,6 +255,37 @@ def iter_submodule_names(path, root=""):
             yield root + module_name
 
 
+# Load the registration manifest
+#################################################
+
+def load_registration_manifest(path):
+    manifest_file = path / REGISTRATION_MANIFEST_FILE
+    if not manifest_file.is_file():
+        return None
+    try:
+        manifest = json.loads(manifest_file.read_text(encoding="utf-8"))
+    except ValueError as e:
+        print("Failed to read the registration manifest:", e)
+        return None
+    if manifest.get("version") != REGISTRATION_MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def get_registration_from_manifest(path, manifest):
+    # import the modules listed in the manifest and return (modules, ordered classes, framework classes)
+    import_as_extension = is_extension()
+    modules_by_name = {}
+    for name in manifest["modules"]:
+        with timing_report.measure("import", name):
+            modules_by_name[name] = import_submodule(path, name, import_as_extension)
+    manifest_modules = [modules_by_name[name] for name in sorted(modules_by_name)]
+    manifest_classes = [getattr(modules_by_name[module], name) for module, name in manifest["classes"]]
+    manifest_framework_classes = {getattr(modules_by_name[module], name)
+                                  for module, name in manifest["framework_classes"]}
+    return manifest_modules, manifest_classes, manifest_framework_classes
+
+
 # Find classes to register
 #################################################
 
@@ -103,7 +303,11 @@ def get_framework_classes(modules):
 
 
 def get_register_deps_dict(modules):
-    my_classes = set(iter_my_classes(modules))
+    # lazy operators are usually declared in packages, which are not in modules
+    return get_register_deps_dict_of_classes(set(iter_my_classes(modules)) | set(get_lazy_operators()))
+
+
+def get_register_deps_dict_of_classes(my_classes):
     my_classes_by_idname = {cls.bl_idname: cls for cls in my_classes if hasattr(cls, "bl_idname")}
 
     deps_dict = {}
@@ -112,6 +316,15 @@ def get_register_deps_dict(modules):
     return deps_dict
 
 
+# what decides the registration order: the classes, their dependencies and their _reg_order
+def get_registration_signature(deps_dict):
+    def get_class_key(cls):
+        return cls.__module__, cls.__qualname__
+
+    return {get_class_key(cls): (getattr(cls, "_reg_order", None), sorted(map(get_class_key, deps)))
+            for cls, deps in deps_dict.items()}
+
+
 def iter_my_register_deps(cls, my_classes, my_classes_by_idname):
     yield from iter_my_deps_from_annotations(cls, my_classes)
     yield from iter_my_deps_from_inheritance(cls, my_classes)
@@ -154,8 +367,10 @@ def iter_my_deps_from_parent_id(cls, my_classes_by_idname):
 
 def iter_my_classes(modules):
     base_types = get_register_base_types()
+    # the lazy operators are registered instead of the classes of their implementation modules
+    lazy_modules = get_lazy_modules()
     for cls in get_classes_in_modules(modules):
-        if any(base in base_types for base in cls.__mro__[1:]):
+        if any(base in base_types for base in cls.__mro__[1:]) and cls.__module__ not in lazy_modules:
             if not getattr(cls, "is_registered", False):
                 yield cls
 
@@ -192,27 +407,10 @@ def get_framework_base_classes():
 #################################################
 
 def toposort(deps_dict):
-    sorted_list = []
-    sorted_values = set()
-    while len(deps_dict) > 0:
-        unsorted = []
-        # class with no dependencies
-        independent = []
-        for value, deps in deps_dict.items():
-            if len(deps) == 0:
-                independent.append(value)
-            else:
-                unsorted.append(value)
-
-        # sort no dependencies by _reg_order
-        independent.sort(key=lambda x: getattr(x, "_reg_order", float('inf')))
-        # add to sorted list
-        for value in independent:
-            sorted_list.append(value)
-            sorted_values.add(value)
-
-        deps_dict = {value: deps_dict[value] - sorted_values for value in unsorted}
-    return sorted_list
+    # classes with no dependencies relationship are sorted by _reg_order, then by name to keep the order stable
+    return sort_by_dependencies(deps_dict,
+                                lambda cls: (getattr(cls, "_reg_order", float('inf')), cls.__module__, cls.__qualname__),
+                                lambda cls: f"{cls.__module__}.{cls.__qualname__}")
 
 
 def register_framework_class(cls):
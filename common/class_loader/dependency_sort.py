@@ -0,0 +1,55 @@
+import heapq
+
+
+def sort_by_dependencies(deps_dict: dict, sort_key=None, describe=str) -> list:
+    """
+    Order the items of deps_dict (item -> set of items it depends on) so that every item comes after its dependencies,
+    with Kahn's algorithm in O((V + E) log V). Among the items whose dependencies are all sorted, the one with the
+    smallest sort_key is taken first, items with the same sort_key keep the order of deps_dict. Dependencies which are
+    not items of deps_dict are ignored.
+    Raises ValueError naming the items of a cycle (described by describe) if the dependencies contain one.
+    按依赖关系排序，依赖的项排在前面，无依赖关系的项按sort_key排序，存在循环依赖时抛出ValueError
+    """
+    dependents = {item: [] for item in deps_dict}
+    remaining_deps = {}
+    for item, deps in deps_dict.items():
+        deps = [dependency for dependency in deps if dependency in dependents and dependency != item]
+        remaining_deps[item] = len(deps)
+        for dependency in deps:
+            dependents[dependency].append(item)
+
+    # rank the items by sort_key once (the sort is stable, so the order of deps_dict breaks ties), the heap then only
+    # compares the ranks
+    items = list(deps_dict)
+    if sort_key is not None:
+        items.sort(key=sort_key)
+    ranks = {item: rank for rank, item in enumerate(items)}
+
+    heap = [(ranks[item], item) for item in items if remaining_deps[item] == 0]
+    heapq.heapify(heap)
+    sorted_list = []
+    while heap:
+        item = heapq.heappop(heap)[1]
+        sorted_list.append(item)
+        for dependent in dependents[item]:
+            remaining_deps[dependent] -= 1
+            if remaining_deps[dependent] == 0:
+                heapq.heappush(heap, (ranks[dependent], dependent))
+
+    if len(sorted_list) < len(deps_dict):
+        cycle = find_cycle(deps_dict, {item for item, count in remaining_deps.items() if count > 0})
+        raise ValueError("Circular dependencies: " + " -> ".join(describe(item) for item in cycle))
+    return sorted_list
+
+
+def find_cycle(deps_dict: dict, unsorted_items: set) -> list:
+    # every unsorted item depends on an unsorted item, so following them from any unsorted item must run into a cycle
+    path = []
+    positions = {}
+    item = next(item for item in deps_dict if item in unsorted_items)
+    while item not in positions:
+        positions[item] = len(path)
+        path.append(item)
+        item = next(dependency for dependency in deps_dict[item]
+                    if dependency in unsorted_items and dependency != item)
+    return path[positions[item]:] + [item]
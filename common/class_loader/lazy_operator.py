@@ -0,0 +1,152 @@
+import importlib
+import importlib.util
+import inspect
+
+import bpy
+
+__all__ = (
+    "lazy_operator",
+    "NOT_NONE",
+    "get_lazy_operators",
+    "get_lazy_modules",
+)
+
+
+class _NotNone:
+    def __repr__(self):
+        return "NOT_NONE"
+
+
+# expected value of a poll condition which only requires the value to be set
+# poll条件的期望值 只要求值不为None
+NOT_NONE = _NotNone()
+
+# bl_idname -> lazy operator class, declaring an operator again replaces the previous one
+_lazy_operators = {}
+
+
+def lazy_operator(module: str, class_name: str, package: str, bl_idname: str, bl_label: str, bl_options: set = None,
+                  bl_description: str = None, poll=None, properties: dict = None, has_draw: bool = False):
+    """
+    Create a lightweight operator class standing in for the operator class_name defined in module, module is imported
+    only when the operator is executed or invoked for the first time. Use it for operators whose module imports heavy
+    modules (bmesh, mathutils.kdtree, numpy...), enabling the addon then no longer imports them.
+    module is resolved relative to package, usually ".ModuleName" with package=__package__.
+    bl_idname, bl_label, bl_options and bl_description must match the operator's. properties (name -> bpy.props
+    property) declares the operator properties the implementation uses. poll is either a function taking the context
+    or a dict of conditions on the context, e.g. {"active_object.type": "MESH", "active_object.mode": "EDIT"}: the
+    value at each dotted path must equal the expected value, be one of the values of a set/tuple, or be set for
+    NOT_NONE. Pass has_draw=True if the implementation has a draw method.
+    The implementation is called with the lazy operator as self, attributes missing on the lazy operator (helper
+    methods, constants) are looked up on the implementation class, but super() can not be used in the implementation.
+
+    Declare the lazy operators in the __init__.py of the package of the implementation module, auto_load then never
+    imports the implementation module and registers the lazy operators instead of the classes defined in it. Import
+    them from the package (e.g. in panels) instead of importing the implementation module.
+    operators/__init__.py:
+        ExampleOperator = lazy_operator(".AddonOperators", "ExampleOperator", __package__,
+                                        bl_idname="object.example_ops", bl_label="ExampleOperator",
+                                        bl_options={'REGISTER', 'UNDO'}, poll={"active_object": NOT_NONE})
+    创建一个轻量的占位算子，插件启用时不导入实现模块，算子第一次执行时才导入
+    """
+    namespace = {
+        "__module__": package,
+        "__qualname__": class_name,
+        "__doc__": bl_description,
+        "__annotations__": dict(properties or {}),
+        "bl_idname": bl_idname,
+        "bl_label": bl_label,
+        "bl_options": set(bl_options or ()),
+        "_lazy_module": importlib.util.resolve_name(module, package),
+        "_lazy_class_name": class_name,
+        "execute": _execute,
+        "invoke": _invoke,
+        "modal": _modal,
+        "cancel": _cancel,
+        "__getattr__": _getattr,
+    }
+    if bl_description is not None:
+        namespace["bl_description"] = bl_description
+    if poll is not None:
+        namespace["poll"] = classmethod(_make_poll(poll))
+    if has_draw:
+        namespace["draw"] = _draw
+    cls = type(class_name, (bpy.types.Operator,), namespace)
+    _lazy_operators[bl_idname] = cls
+    return cls
+
+
+def get_lazy_operators() -> list:
+    return list(_lazy_operators.values())
+
+
+def get_lazy_modules() -> set:
+    # full names of the implementation modules of the lazy operators
+    return {cls._lazy_module for cls in _lazy_operators.values()}
+
+
+def get_implementation(cls):
+    # looked up on every call, so the implementation module can be reloaded when testing
+    return getattr(importlib.import_module(cls._lazy_module), cls._lazy_class_name)
+
+
+def _execute(self, context):
+    return get_implementation(type(self)).execute(self, context)
+
+
+def _invoke(self, context, event):
+    invoke = getattr(get_implementation(type(self)), "invoke", None)
+    if invoke is None:
+        # same as an operator without invoke
+        return self.execute(context)
+    return invoke(self, context, event)
+
+
+def _modal(self, context, event):
+    return get_implementation(type(self)).modal(self, context, event)
+
+
+def _cancel(self, context):
+    cancel = getattr(get_implementation(type(self)), "cancel", None)
+    if cancel is not None:
+        cancel(self, context)
+
+
+def _draw(self, context):
+    get_implementation(type(self)).draw(self, context)
+
+
+def _getattr(self, name):
+    if name.startswith("__"):
+        raise AttributeError(name)
+    implementation = get_implementation(type(self))
+    value = inspect.getattr_static(implementation, name)
+    # bind methods to the lazy operator, classmethods to the implementation class
+    if hasattr(value, "__get__"):
+        return value.__get__(self, implementation)
+    return value
+
+
+def _make_poll(poll):
+    if callable(poll):
+        return lambda cls, context: poll(context)
+    conditions = [(path.split("."), expected) for path, expected in poll.items()]
+
+    def check_conditions(cls, context):
+        for attributes, expected in conditions:
+            value = context
+            for attribute in attributes:
+                value = getattr(value, attribute, None)
+                if value is None:
+                    break
+            if expected is NOT_NONE:
+                if value is None:
+                    return False
+            elif isinstance(expected, (set, frozenset, tuple, list)):
+                if value not in expected:
+                    return False
+            elif value != expected:
+                return False
+        return True
+
+    return check_conditions
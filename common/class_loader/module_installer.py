@@ -1,16 +1,33 @@
 # Notice: Please do not use functions in this file for developing your Blender Addons, this file is for internal use of
 # the framework, it contains some modules that Blender officially prohibits using in Addons. Such as sys
 # 注意：请不要在Blender中使用此文件中的函数,此文件用于框架内部使用,包含了一些Blender官方禁止在插件中使用的模块 如sys
-import importlib.metadata
 import importlib.util
+import json
 import os
 import platform
 import subprocess
 import sys
 
 
-def install(package):
-    subprocess.check_call([sys.executable, "-m", "pip", "install", package])
+# Blender executable -> its version and addon path, so the version is not detected by running Blender every time the
+# framework is imported. An entry is dropped when the size or the modification time of the executable changes.
+# 缓存Blender可执行文件的版本和插件路径 避免每次导入框架都运行Blender
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_BLENDER_INFO_CACHE_FILE = os.path.join(_PROJECT_ROOT, ".blender_info_cache.json")
+_BLENDER_INFO_CACHE_VERSION = 1
+_blender_info_cache = None
+
+# Python executable -> the requirements and pip options of the last successful provision_dependencies, the check is
+# skipped while they do not change. Delete this file to check the installed packages again.
+# 记录每个python环境上次成功安装的依赖 依赖不变时跳过检查 删除该文件可重新检查
+_DEPENDENCY_STAMP_FILE = os.path.join(_PROJECT_ROOT, ".dependency_stamp.json")
+_DEPENDENCY_STAMP_VERSION = 1
+
+_FAKE_BPY_PREFIX = "fake-bpy-module-"
+
+
+def install(*packages, pip_args=()):
+    subprocess.check_call([sys.executable, "-m", "pip", "install", *pip_args, *packages])
 
 
 def has_module(module_name):
@@ -21,6 +38,8 @@ def has_module(module_name):
 
 
 def is_package_installed(package_name):
+    # importlib.metadata is slow to import and only needed when installing packages
+    import importlib.metadata
     try:
         importlib.metadata.version(package_name)
         return True
@@ -28,12 +47,52 @@ def is_package_installed(package_name):
         return False
 
 
-def install_if_missing(package):
-    if not has_module(package):
-        install(package)
+def load_blender_info(blender_exe_path):
+    # the cached info of the executable, reset if the executable changed, None if it does not exist
+    global _blender_info_cache
+    if _blender_info_cache is None:
+        try:
+            with open(_BLENDER_INFO_CACHE_FILE, "r", encoding="utf-8") as f:
+                _blender_info_cache = json.load(f)
+        except (OSError, ValueError):
+            _blender_info_cache = {}
+        if _blender_info_cache.get("version") != _BLENDER_INFO_CACHE_VERSION:
+            _blender_info_cache = {"version": _BLENDER_INFO_CACHE_VERSION, "executables": {}}
+    try:
+        stat = os.stat(blender_exe_path)
+    except OSError:
+        return None
+    executables = _blender_info_cache["executables"]
+    key = os.path.abspath(blender_exe_path)
+    info = executables.get(key)
+    if info is None or info.get("size") != stat.st_size or info.get("mtime_ns") != stat.st_mtime_ns:
+        info = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        executables[key] = info
+    return info
+
+
+def save_blender_info():
+    try:
+        temp_file = _BLENDER_INFO_CACHE_FILE + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(_blender_info_cache, f, indent=1)
+        os.replace(temp_file, _BLENDER_INFO_CACHE_FILE)
+    except OSError as e:
+        print("Failed to save the Blender info cache:", e)
 
 
 def get_blender_version(blender_exe_path):
+    info = load_blender_info(blender_exe_path)
+    if info is not None and "version" in info:
+        return info["version"]
+    version = run_blender_version(blender_exe_path)
+    if info is not None and version is not None:
+        info["version"] = version
+        save_blender_info()
+    return version
+
+
+def run_blender_version(blender_exe_path):
     try:
         # Run the Blender executable with --version
         result = subprocess.run(
@@ -67,25 +126,94 @@ def extract_blender_version(blender_exe_path: str):
     return None
 
 
-def install_fake_bpy(blender_path: str):
+def get_fake_bpy_package(blender_path: str) -> str:
+    # the fake bpy module matching the version of the Blender executable
     blender_version = extract_blender_version(blender_path)
     if blender_version is None:
         print("Blender version not found in path: " + blender_path)
         blender_version = "latest"
-    desired_module = "fake-bpy-module-" + blender_version
-    if has_module("bpy"):
-        if not is_package_installed(desired_module):
-            print("Your fake bpy module is different from the current blender version! You might need to update it.")
-        return
-    else:
-        print("Installing fake bpy module for Blender version: " + blender_version)
+    return _FAKE_BPY_PREFIX + blender_version
+
+
+def get_pip_source_args(wheels_dir: str = None, index_url: str = None, offline: bool = False) -> list:
+    """
+    pip options to install packages from the .whl files in wheels_dir, from the package index at index_url instead of
+    PyPI, and from nothing else if offline.
+    从wheels_dir中的whl文件或index_url指定的本地索引安装依赖 offline时不访问PyPI
+    """
+    pip_args = []
+    if index_url:
+        pip_args += ["--index-url", index_url]
+    elif offline:
+        pip_args.append("--no-index")
+    if wheels_dir and os.path.isdir(wheels_dir) and any(name.endswith(".whl") for name in os.listdir(wheels_dir)):
+        pip_args += ["--find-links", os.path.abspath(wheels_dir)]
+    return pip_args
+
+
+def provision_dependencies(requirements: list, pip_args: list = ()) -> bool:
+    """
+    Make sure the packages in requirements, a list of (module name, package name), are installed in the current python
+    environment. The packages whose module can not be imported are installed with a single pip call using pip_args
+    (see get_pip_source_args). Once everything is installed, the requirements are added to the stamp of the python
+    environment, later calls whose requirements are all stamped with the same pip_args return immediately. Return
+    whether every requirement is satisfied.
+    一次性检查并安装所有依赖 全部满足后记录标记文件 之后依赖不变时跳过检查
+    """
+    stamps = load_dependency_stamps()
+    stamp = stamps["environments"].get(sys.executable)
+    if stamp is None or stamp["pip_args"] != list(pip_args):
+        stamp = {"requirements": [], "pip_args": list(pip_args)}
+    stamped_requirements = {tuple(requirement) for requirement in stamp["requirements"]}
+    if stamped_requirements.issuperset(requirements):
+        return True
+    satisfied = True
+    missing = []
+    for module_name, package in requirements:
+        if not has_module(module_name):
+            missing.append(package)
+        elif not is_package_installed(package):
+            # e.g. the fake bpy module of another Blender version
+            print(f"Your {module_name} module is not provided by {package}! You might need to update it.")
+            satisfied = False
+    if missing:
+        print("Installing dependencies: " + ", ".join(missing))
         try:
-            install(desired_module)
-        except Exception as e:
-            if desired_module != "fake-bpy-module-latest":
-                print(
-                    "Failed to install fake bpy module for Blender version: " + blender_version + "! Trying to install the latest version.")
-                install("fake-bpy-module-latest")
+            install(*missing, pip_args=pip_args)
+        except subprocess.CalledProcessError:
+            fallback = [_FAKE_BPY_PREFIX + "latest" if package.startswith(_FAKE_BPY_PREFIX) else package
+                        for package in missing]
+            if fallback == missing:
+                raise
+            print("Failed to install " + ", ".join(missing) + "! Trying to install the latest fake bpy module.")
+            install(*fallback, pip_args=pip_args)
+            satisfied = False
+    if satisfied:
+        stamp["requirements"] = sorted(list(requirement) for requirement in stamped_requirements.union(requirements))
+        stamps["environments"][sys.executable] = stamp
+        save_dependency_stamps(stamps)
+    return satisfied
+
+
+def load_dependency_stamps() -> dict:
+    try:
+        with open(_DEPENDENCY_STAMP_FILE, "r", encoding="utf-8") as f:
+            stamps = json.load(f)
+    except (OSError, ValueError):
+        stamps = {}
+    if stamps.get("version") != _DEPENDENCY_STAMP_VERSION:
+        stamps = {"version": _DEPENDENCY_STAMP_VERSION, "environments": {}}
+    return stamps
+
+
+def save_dependency_stamps(stamps: dict):
+    try:
+        temp_file = _DEPENDENCY_STAMP_FILE + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(stamps, f, indent=1)
+        os.replace(temp_file, _DEPENDENCY_STAMP_FILE)
+    except OSError as e:
+        print("Failed to save the dependency stamp:", e)
 
 
 def normalize_blender_path_by_system(blender_path: str):
@@ -97,19 +225,25 @@ def normalize_blender_path_by_system(blender_path: str):
 
 def default_blender_addon_path(blender_path: str):
     blender_path = normalize_blender_path_by_system(blender_path)
+    info = load_blender_info(blender_path)
+    if info is not None and "addon_path" in info:
+        return info["addon_path"]
     blender_version = extract_blender_version(blender_path)
     assert blender_version is not None, "Can not detect Blender version with " + blender_path + "!"
     if is_windows() or is_linux():
-        new_path = os.path.join(os.path.dirname(blender_path), blender_version, "scripts", "addons_core")
-        if os.path.exists(new_path):
-            return new_path
-        return os.path.join(os.path.dirname(blender_path), blender_version, "scripts", "addons")
+        addon_path = os.path.join(os.path.dirname(blender_path), blender_version, "scripts", "addons_core")
+        if not os.path.exists(addon_path):
+            addon_path = os.path.join(os.path.dirname(blender_path), blender_version, "scripts", "addons")
     elif is_mac():
         user_path = os.path.expanduser("~")
-        return os.path.join(user_path, f"Library/Application Support/Blender/{blender_version}/scripts/addons")
+        addon_path = os.path.join(user_path, f"Library/Application Support/Blender/{blender_version}/scripts/addons")
     else:
         raise Exception(
             "This Framework is currently not compatible with your operating system! Please use Windows, MacOS or Linux.")
+    if info is not None:
+        info["addon_path"] = addon_path
+        save_blender_info()
+    return addon_path
 
 
 def is_windows():
@@ -0,0 +1,51 @@
+import json
+import time
+from contextlib import contextmanager
+
+__all__ = (
+    "TIMING_ENV_VAR",
+    "TimingReport",
+)
+
+# Set this environment variable to print the timing report when the addon is enabled, "json" prints it as JSON.
+# The test script sets it for the Blender process it starts.
+# 设置该环境变量后启用插件时会打印各模块导入与各类注册的耗时
+TIMING_ENV_VAR = "BLENDER_ADDON_REGISTRATION_TIMING"
+
+
+class TimingReport:
+    """
+    Wall time of each step of loading an addon, in the order they ran. Each record is a dict with the kind of step
+    ("import", "register_class", "register", "register_framework_class"), its name (module or class) and its
+    duration in seconds. The time of importing a module includes the modules it imports first.
+    记录插件加载过程中每个步骤的耗时
+    """
+
+    def __init__(self):
+        self.records = []
+
+    @contextmanager
+    def measure(self, kind: str, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.records.append({"kind": kind, "name": name, "seconds": time.perf_counter() - start})
+
+    def get_total(self, kind: str = None) -> float:
+        return sum(record["seconds"] for record in self.records if kind is None or record["kind"] == kind)
+
+    def to_json(self) -> str:
+        return json.dumps({"total_seconds": self.get_total(), "records": self.records}, indent=1)
+
+    def format_table(self, limit: int = None) -> str:
+        # the slowest steps first, followed by the total time of each kind of step
+        records = sorted(self.records, key=lambda record: record["seconds"], reverse=True)[:limit]
+        kind_width = max([len("kind")] + [len(record["kind"]) for record in records])
+        lines = [f"{'ms':>9}  {'kind':<{kind_width}}  name"]
+        for record in records:
+            lines.append(f"{record['seconds'] * 1000:9.2f}  {record['kind']:<{kind_width}}  {record['name']}")
+        kinds = sorted({record["kind"] for record in self.records})
+        totals = ", ".join(f"{kind} {self.get_total(kind) * 1000:.2f}" for kind in kinds)
+        lines.append(f"total {self.get_total() * 1000:.2f} ms ({totals})")
+        return "\n".join(lines)
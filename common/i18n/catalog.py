@@ -0,0 +1,80 @@
+import json
+import os
+
+# Translation catalogs compiled from the dictionary of an addon when releasing it, one file per language (languages
+# with the same translations share a file), so only the catalog of the language in use is read when the addon is
+# enabled. A translation defined for both the "*" and the "Operator" context is stored once.
+# 发布时将插件的翻译字典编译为按语言拆分的目录文件 插件启用时只读取正在使用的语言
+
+CATALOG_FOLDER = "catalogs"
+CATALOG_INDEX_FILE = "index.json"
+CATALOG_VERSION = 1
+# context index of a translation defined for both the "*" and the "Operator" context
+_DEFAULT_CONTEXTS = -1
+
+# message ids and contexts read from the catalogs, the same string is shared by every catalog
+_strings = {}
+
+
+def compile_catalogs(dictionary: dict) -> dict:
+    """
+    Compile a translation dictionary ({language: {(context, message id) or message id: translation}}) into catalog
+    files, return {file name: content}. A message id without context is translated in the "*" and the "Operator"
+    context, as preprocess_dictionary does.
+    """
+    catalogs = {}
+    index = {}
+    for language in sorted(dictionary):
+        translations = {}
+        for key, translation in dictionary[language].items():
+            if isinstance(key, str):
+                key = ("*", key)
+                translations[("Operator", key[1])] = translation
+            translations[key] = translation
+        contexts = sorted({context for context, _ in translations})
+        context_indexes = {context: i for i, context in enumerate(contexts)}
+        messages = []
+        for (context, message), translation in sorted(translations.items()):
+            if context == "Operator" and translations.get(("*", message)) == translation:
+                continue
+            if context == "*" and translations.get(("Operator", message)) == translation:
+                messages.append([_DEFAULT_CONTEXTS, message, translation])
+            else:
+                messages.append([context_indexes[context], message, translation])
+        content = json.dumps({"version": CATALOG_VERSION, "contexts": contexts, "messages": messages},
+                             ensure_ascii=False, separators=(",", ":"))
+        # languages with the same translations (e.g. zh_HANS and zh_CN) share the catalog of the first one
+        file_name = next((name for name, existing in catalogs.items() if existing == content), f"{language}.json")
+        catalogs[file_name] = content
+        index[language] = file_name
+    catalogs[CATALOG_INDEX_FILE] = json.dumps({"version": CATALOG_VERSION, "languages": index}, indent=1)
+    return catalogs
+
+
+def read_catalog_index(folder: str):
+    # return {language: catalog file path}, or None if there are no catalogs of a supported version in folder
+    index_file = os.path.join(folder, CATALOG_INDEX_FILE)
+    if not os.path.isfile(index_file):
+        return None
+    with open(index_file, "r", encoding="utf-8") as f:
+        index = json.load(f)
+    if index.get("version") != CATALOG_VERSION:
+        return None
+    return {language: os.path.join(folder, file_name) for language, file_name in index["languages"].items()}
+
+
+def read_catalog(catalog_file: str) -> dict:
+    # return {(context, message id): translation} in the format of bpy.app.translations
+    with open(catalog_file, "r", encoding="utf-8") as f:
+        catalog = json.load(f)
+    contexts = [_strings.setdefault(context, context) for context in catalog["contexts"]]
+    default_contexts = [_strings.setdefault(context, context) for context in ("*", "Operator")]
+    translations = {}
+    for context_index, message, translation in catalog["messages"]:
+        message = _strings.setdefault(message, message)
+        if context_index == _DEFAULT_CONTEXTS:
+            for context in default_contexts:
+                translations[(context, message)] = translation
+        else:
+            translations[(contexts[context_index], message)] = translation
+    return translations
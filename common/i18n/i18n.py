@@ -1,12 +1,20 @@
+import functools
+import importlib
+import os
+
 import bpy
 
 # Get the language code when addon start up
 __language_code__ = bpy.context.preferences.view.language
 
+from .catalog import CATALOG_FOLDER, read_catalog, read_catalog_index
 from .dictionary import common_dictionary
 
 __dictionary__ = common_dictionary
 
+# number of translated strings kept in memory
+TRANSLATION_CACHE_SIZE = 1024
+
 
 # Dictionary for translation: https://docs.blender.org/api/current/bpy.app.translations.html
 # {
@@ -24,10 +32,16 @@ __dictionary__ = common_dictionary
 def set_dictionary(new_dictionary: dict[str, dict[tuple, str]]):
     global __dictionary__
     __dictionary__ = new_dictionary
+    clear_cache()
 
 
 # Load additional dictionary for translation
 def load_dictionary(additional_dictionary: dict[str, dict[tuple, str]]):
+    _merge_dictionary(additional_dictionary)
+    clear_cache()
+
+
+def _merge_dictionary(additional_dictionary: dict[str, dict[tuple, str]]):
     global __dictionary__
     for key in additional_dictionary:
         if key in __dictionary__:
@@ -35,19 +49,118 @@ def load_dictionary(additional_dictionary: dict[str, dict[tuple, str]]):
         else:
             __dictionary__[key] = {}
             __dictionary__[key].update(additional_dictionary[key])
+        _translation_indexes.pop(key, None)
+
+
+# Load the translations of an addon, i18n_package is the i18n package of the addon, e.g. __package__ + ".i18n".
+# A released addon has the catalogs compiled from its dictionary (see catalog.py), the catalog of a language is only
+# read when the language is used. Otherwise the dictionary of the dictionary module of the package is loaded.
+# 加载插件的翻译 发布后的插件使用编译好的翻译目录 只在用到某个语言时才读取该语言
+def load_translations(i18n_package: str):
+    catalog_files = read_catalog_index(os.path.join(importlib.import_module(i18n_package).__path__[0],
+                                                    CATALOG_FOLDER))
+    if catalog_files is None:
+        load_dictionary(importlib.import_module(".dictionary", i18n_package).dictionary)
+        return
+    _catalog_files.update(catalog_files)
+    clear_cache()
+
+
+# Feed the loaded translations to bpy.app.translations, the translations are registered again when the language is
+# changed to one whose catalog is not read yet
+def register_translations(addon_name: str):
+    if not _language_subscribed:
+        refresh_language()
+    _load_catalog(__language_code__)
+    bpy.app.translations.register(addon_name, __dictionary__)
+    _registered_addon_names.add(addon_name)
+
+
+def unregister_translations(addon_name: str):
+    _registered_addon_names.discard(addon_name)
+    bpy.app.translations.unregister(addon_name)
+
+
+def _load_catalog(language_code: str) -> bool:
+    # read the catalog of the language if it is not read yet, return whether it is read now
+    catalog_file = _catalog_files.pop(language_code, None)
+    if catalog_file is None:
+        return False
+    _merge_dictionary({language_code: read_catalog(catalog_file)})
+    return True
 
 
 # 在需要拼接字符串的地方使用i18n函数
 def i18n(content: str) -> str:
-    global __language_code__, __dictionary__
+    if not _language_subscribed:
+        refresh_language()
+    return _translate(__language_code__, content)
+
+
+# Call it after changing the language from a script, Blender does not notify the change in that case.
+# The dictionary must be changed with set_dictionary/load_dictionary, or clear_cache must be called after changing it.
+# 通过脚本修改语言后请调用此函数
+def refresh_language():
+    global __language_code__
     __language_code__ = bpy.context.preferences.view.language
-    if __language_code__ not in __dictionary__:
+    if _load_catalog(__language_code__):
+        for addon_name in _registered_addon_names:
+            bpy.app.translations.unregister(addon_name)
+            bpy.app.translations.register(addon_name, __dictionary__)
+
+
+def clear_cache():
+    _translation_indexes.clear()
+    _translate.cache_clear()
+
+
+# message id -> translation of each language, built the first time a language is used
+_translation_indexes = {}
+# language -> catalog file not read yet
+_catalog_files = {}
+_registered_addon_names = set()
+_language_subscribed = False
+_msgbus_owner = object()
+
+
+@functools.lru_cache(maxsize=TRANSLATION_CACHE_SIZE)
+def _translate(language_code: str, content: str) -> str:
+    _load_catalog(language_code)
+    if language_code not in __dictionary__:
         return content
-    tuple_contents = [("*", content), ("Operator", content)]
-    for tuple_content in tuple_contents:
-        if tuple_content in __dictionary__[__language_code__]:
-            return __dictionary__[__language_code__][tuple_content]
-    for key in __dictionary__[__language_code__]:
-        if key[1] == content:
-            return __dictionary__[__language_code__][key]
-    return content
+    index = _translation_indexes.get(language_code)
+    if index is None:
+        index = _build_translation_index(__dictionary__[language_code])
+        _translation_indexes[language_code] = index
+    return index.get(content, content)
+
+
+def _build_translation_index(translations: dict[tuple, str]) -> dict[str, str]:
+    # ("*", content) is preferred, then ("Operator", content), then the first translation of content in any context
+    index = {}
+    for key, translation in translations.items():
+        if isinstance(key, tuple):
+            index.setdefault(key[1], translation)
+    for context in ("Operator", "*"):
+        for key, translation in translations.items():
+            if isinstance(key, tuple) and key[0] == context:
+                index[key[1]] = translation
+    return index
+
+
+# Call it when the addon is registered, the language is then only read again when Blender notifies it is changed from
+# the preferences instead of on every i18n call. Call unsubscribe_language_change when the addon is unregistered.
+# 插件注册时调用 之后只在偏好设置中的语言改变时重新读取语言 插件注销时调用unsubscribe_language_change
+def subscribe_language_change():
+    global _language_subscribed
+    refresh_language()
+    bpy.msgbus.subscribe_rna(key=(bpy.types.PreferencesView, "language"), owner=_msgbus_owner, args=(),
+                             notify=refresh_language, options={"PERSISTENT"})
+    _language_subscribed = True
+
+
+def unsubscribe_language_change():
+    global _language_subscribed
+    bpy.msgbus.clear_by_owner(_msgbus_owner)
+    _language_subscribed = False
+    clear_cache()
@@ -0,0 +1,102 @@
+import os
+import struct
+import zlib
+
+# Zip archive writer used when releasing addons.
+# Entries are compressed in parallel (zlib releases the GIL), already compressed files are stored as they are, and all
+# entries are written in sorted order with a fixed timestamp and fixed permissions, so the same input always produces
+# the same archive.
+# 用于发布插件的zip写入工具：并行压缩，已压缩的文件直接存储，固定时间戳与排序，保证相同的输入得到完全相同的压缩包
+
+# 1980-01-01 00:00:00 is the earliest time a zip entry can hold
+FIXED_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+DEFAULT_COMPRESS_LEVEL = 6
+# files of these types are already compressed, compressing them again only costs time
+STORED_FILE_TYPES = {
+    ".whl", ".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".rar",
+    ".png", ".jpg", ".jpeg", ".webp", ".gif",
+    ".mp3", ".ogg", ".mp4", ".webm",
+}
+
+_ZIP_STORED = 0
+_ZIP_DEFLATED = 8
+_ZIP_VERSION = 20
+_ZIP_UNIX_SYSTEM = 3
+_ZIP_UTF8_FLAG = 0x800
+_ZIP_MAX_SIZE = 0xFFFFFFFF
+_ZIP_MAX_ENTRIES = 0xFFFF
+_FILE_ATTR = 0o100644 << 16
+# directory with rwxr-xr-x permissions, 0x10 is the MS-DOS directory flag
+_FOLDER_ATTR = (0o40755 << 16) | 0x10
+_LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+_CENTRAL_HEADER = struct.Struct("<4s4B4HL2L5H2L")
+_END_RECORD = struct.Struct("<4s4H2LH")
+
+
+def is_compressed_file(filename: str) -> bool:
+    return os.path.splitext(filename)[1].lower() in STORED_FILE_TYPES
+
+
+def compress_entry(filename: str, content: bytes, compress_level: int):
+    # return (compress method, crc, compressed content) of a file entry
+    crc = zlib.crc32(content)
+    if compress_level == 0 or len(content) == 0 or is_compressed_file(filename):
+        return _ZIP_STORED, crc, content
+    compressor = zlib.compressobj(compress_level, zlib.DEFLATED, -15)
+    compressed = compressor.compress(content) + compressor.flush()
+    if len(compressed) >= len(content):
+        return _ZIP_STORED, crc, content
+    return _ZIP_DEFLATED, crc, compressed
+
+
+def write_zip_archive(output_file: str, files: dict, folders=(), compress_level: int = DEFAULT_COMPRESS_LEVEL,
+                      max_workers: int = None, date_time: tuple = FIXED_DATE_TIME):
+    """
+    Write a zip archive to output_file.
+    files maps the name of each file in the archive ("/" separated) to its content, folders are the names of the
+    folder entries. Entries are written in sorted order.
+    compress_level is the zlib compression level from 0 (store only) to 9.
+    Files are compressed in parallel by a thread pool with max_workers threads.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    if not 0 <= compress_level <= 9:
+        raise ValueError("Invalid compress level:", compress_level, "Please use a level from 0 to 9")
+    if len(files) + len(folders) > _ZIP_MAX_ENTRIES:
+        raise ValueError("Too many entries for a zip archive:", len(files) + len(folders))
+    dos_date = (date_time[0] - 1980) << 9 | date_time[1] << 5 | date_time[2]
+    dos_time = date_time[3] << 11 | date_time[4] << 5 | (date_time[5] // 2)
+
+    entries = sorted([(name.rstrip("/") + "/", None) for name in folders] + list(files.items()))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = [executor.submit(compress_entry, name, content, compress_level) if content is not None else None
+                   for name, content in entries]
+
+        central_directory = []
+        with open(output_file, "wb") as f:
+            offset = 0
+            for (name, content), result in zip(entries, results):
+                if result is None:
+                    method, crc, data, size, external_attr = _ZIP_STORED, 0, b"", 0, _FOLDER_ATTR
+                else:
+                    method, crc, data = result.result()
+                    size, external_attr = len(content), _FILE_ATTR
+                if size > _ZIP_MAX_SIZE or offset > _ZIP_MAX_SIZE:
+                    raise ValueError("File is too large for a zip archive:", name)
+                encoded_name = name.encode("utf-8")
+                flags = _ZIP_UTF8_FLAG if not name.isascii() else 0
+                f.write(_LOCAL_HEADER.pack(b"PK\003\004", _ZIP_VERSION, 0, flags, method, dos_time, dos_date,
+                                           crc, len(data), size, len(encoded_name), 0))
+                f.write(encoded_name)
+                f.write(data)
+                central_directory.append(
+                    _CENTRAL_HEADER.pack(b"PK\001\002", _ZIP_VERSION, _ZIP_UNIX_SYSTEM, _ZIP_VERSION, 0, flags,
+                                         method, dos_time, dos_date, crc, len(data), size, len(encoded_name),
+                                         0, 0, 0, 0, external_attr, offset) + encoded_name)
+                offset += _LOCAL_HEADER.size + len(encoded_name) + len(data)
+
+            central_directory = b"".join(central_directory)
+            if offset > _ZIP_MAX_SIZE:
+                raise ValueError("Archive is too large for a zip archive:", output_file)
+            f.write(central_directory)
+            f.write(_END_RECORD.pack(b"PK\005\006", 0, 0, len(entries), len(entries), len(central_directory),
+                                     offset, 0))
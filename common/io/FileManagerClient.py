@@ -1,5 +1,7 @@
+import fnmatch
 import hashlib
 import os
+import re
 from os import listdir
 
 
@@ -24,37 +26,105 @@ def is_subdirectory(path_a, path_b) -> bool:
 def is_filename_postfix_in(filename: str, target_set: set):
     if target_set is None or len(target_set) == 0:
         return True
+    filename = filename.lower()
     for postfix in target_set:
-        if filename.lower().endswith(postfix.lower()):
+        if filename.endswith(postfix.lower()):
             return True
     return False
 
 
-# 搜索文件夹下所有文件 post_filter为后缀名集合 全小写
-def search_files(folder_path: str, post_filter: set) -> list:
-    def __depth_first_search_files_helper__(current_folder: str, pre_result: list):
-        for filename in get_all_filename(current_folder):
-            if is_filename_postfix_in(filename, post_filter):
-                pre_result.append(os.path.join(current_folder, filename))
-        all_folders = get_all_subfolder(current_folder)
-        for folder in all_folders:
-            __depth_first_search_files_helper__(os.path.join(current_folder, folder), pre_result)
+# folders that never contain files worth searching: python caches and version control data
+DEFAULT_EXCLUDED_FOLDERS = ("__pycache__", ".git", ".hg", ".svn")
+
+
+def _get_postfix_matcher(post_filter: set):
+    # the lower cased postfixes are grouped by length, so a filename is checked by one set lookup per distinct length
+    # instead of comparing it with every postfix
+    if post_filter is None or len(post_filter) == 0:
+        return None
+    postfixes = {postfix.lower() for postfix in post_filter}
+    lengths = sorted({len(postfix) for postfix in postfixes})
+    if 0 in lengths:
+        # an empty postfix matches everything
+        return None
 
-    all_file = []
-    __depth_first_search_files_helper__(folder_path, all_file)
-    return all_file
+    def is_postfix_matched(filename: str) -> bool:
+        filename = filename.lower()
+        return any(filename[-length:] in postfixes for length in lengths)
 
+    return is_postfix_matched
 
-def get_md5(filename):
-    return hashlib.md5(open(filename, 'rb').read()).hexdigest()
 
+def _get_folder_matcher(exclude_folders):
+    if not exclude_folders:
+        return None
+    return re.compile("|".join(fnmatch.translate(pattern) for pattern in exclude_folders)).match
 
-def get_md5_folder(folder_path: str) -> str:
+
+# 搜索文件夹下所有文件 post_filter为后缀名集合 全小写
+# exclude_folders are glob patterns of the names of the folders to skip, e.g. DEFAULT_EXCLUDED_FOLDERS
+# files are yielded while walking, in the same depth first order as search_files returns them
+def iter_files(folder_path: str, post_filter: set, exclude_folders=()):
+    is_postfix_matched = _get_postfix_matcher(post_filter)
+    is_folder_excluded = _get_folder_matcher(exclude_folders)
+    to_search = [folder_path]
+    while to_search:
+        current_folder = to_search.pop()
+        sub_folders = []
+        with os.scandir(current_folder) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    if is_postfix_matched is None or is_postfix_matched(entry.name):
+                        yield entry.path
+                elif entry.is_dir():
+                    if is_folder_excluded is None or not is_folder_excluded(entry.name):
+                        sub_folders.append(entry.path)
+        # the first sub folder is searched first
+        to_search.extend(reversed(sub_folders))
+
+
+def search_files(folder_path: str, post_filter: set, exclude_folders=()) -> list:
+    return list(iter_files(folder_path, post_filter, exclude_folders))
+
+
+# files are hashed in chunks of this size to keep memory flat for large files
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+# cache is an optional dict used as memo: file path -> (size, modification time, md5)
+# a file whose size and modification time are unchanged is not read again
+def get_md5(filename, cache: dict = None) -> str:
+    if cache is not None:
+        stat = os.stat(filename)
+        cached = cache.get(filename)
+        if cached is not None and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+    md5 = hashlib.md5()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            md5.update(chunk)
+    result = md5.hexdigest()
+    if cache is not None:
+        cache[filename] = (stat.st_size, stat.st_mtime_ns, result)
+    return result
+
+
+# hash files in parallel with a thread pool, hashlib releases the GIL while hashing
+def get_md5_files(files: list, max_workers: int = None, cache: dict = None) -> dict:
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(files, executor.map(lambda file: get_md5(file, cache), files)))
+
+
+# the digest depends on the relative paths and the content of all files, but not on the listing order
+def get_md5_folder(folder_path: str, max_workers: int = None, cache: dict = None) -> str:
     all_files = search_files(folder_path, set())
-    md5_content = ""
-    for file in all_files:
-        md5_content += get_md5(file)
-    return hashlib.md5(md5_content.encode("utf-8")).hexdigest()
+    all_md5 = get_md5_files(all_files, max_workers, cache)
+    rel_paths = {file: os.path.relpath(file, folder_path).replace(os.sep, "/") for file in all_files}
+    md5 = hashlib.md5()
+    for file in sorted(all_files, key=lambda x: rel_paths[x]):
+        md5.update(f"{rel_paths[file]}:{all_md5[file]}\n".encode("utf-8"))
+    return md5.hexdigest()
 
 
 def read_utf8(filepath: str) -> str:
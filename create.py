@@ -1,5 +1,5 @@
 from framework import new_addon
-from main import ACTIVE_ADDON
+from main import settings
 
 # 创建前请修改以下参数
 
@@ -10,6 +10,6 @@ if __name__ == '__main__':
     import argparse
 
     parser = argparse.ArgumentParser()
-    parser.add_argument('addon', default=ACTIVE_ADDON, nargs='?', help='addon name')
+    parser.add_argument('addon', default=settings.active_addon, nargs='?', help='addon name')
     args = parser.parse_args()
     new_addon(args.addon)
@@ -1,5 +1,9 @@
-import ast
 import atexit
+import builtins
+import hashlib
+import io
+import json
+import importlib.util
 import os
 import re
 import shutil
@@ -10,18 +14,14 @@ import time
 from datetime import datetime
 from pathlib import Path
 
-from common.class_loader.module_installer import install_if_missing, install_fake_bpy
-from common.io.FileManagerClient import search_files, read_utf8, write_utf8, is_subdirectory, get_md5_folder, \
-    read_utf8_in_lines, write_utf8_in_lines
-from main import PROJECT_ROOT, BLENDER_ADDON_PATH, BLENDER_EXE_PATH, DEFAULT_RELEASE_DIR, TEST_RELEASE_DIR, IS_EXTENSION
-
-try:
-    # added in python3.11
-    import tomllib
-except ImportError:
-    # for python3.10 and below
-    install_if_missing("toml")
-    import toml
+from common.class_loader.dependency_sort import sort_by_dependencies
+from common.class_loader.module_installer import get_fake_bpy_package, get_pip_source_args, provision_dependencies
+from common.class_loader.registration_timing import TIMING_ENV_VAR
+from common.i18n.catalog import CATALOG_FOLDER, compile_catalogs
+from common.io.ArchiveWriter import write_zip_archive, DEFAULT_COMPRESS_LEVEL
+from common.io.FileManagerClient import search_files, iter_files, read_utf8, write_utf8, is_subdirectory, \
+    read_utf8_in_lines, write_utf8_in_lines, is_filename_postfix_in, get_md5_files, DEFAULT_EXCLUDED_FOLDERS
+from main import PROJECT_ROOT, settings
 
 # Following variables are used internally in the framework according to some protocols defined by Blender or
 # the framework itself. Do not change them unless you know what you are doing.
@@ -32,15 +32,61 @@ _absolute_import_pattern = re.compile(r'^\s*from\s+(\w+[\w.]*)\s+import\s+(.*)$'
 _addon_md5__signature = "addon.txt"
 _ADDON_MANIFEST_FILE = "blender_manifest.toml"
 _WHEELS_PATH = "wheels"
+# 增量发布时用于记录发布清单的缓存目录 位于发布目录下
+_RELEASE_CACHE_FOLDER = ".release_cache"
+_RELEASE_MANIFEST_VERSION = 3
+_IMPORT_GRAPH_CACHE_FILE = "import_graph.json"
+_IMPORT_GRAPH_CACHE_VERSION = 1
+# 测试时文件变化后等待多少秒没有新的变化才更新插件
+_WATCH_DEBOUNCE_SECONDS = 0.2
+_WATCHED_EVENT_TYPES = {"created", "deleted", "modified", "moved"}
+_TREE_SHAKING_REPORT_FILE = "{addon_name}.excluded.txt"
+# classes auto_load registers are subclasses of these, keep in sync with get_register_base_types and
+# get_framework_base_classes in common/class_loader/auto_load.py
+_REGISTRABLE_BASE_TYPES = {
+    "Panel", "Operator", "PropertyGroup",
+    "AddonPreferences", "Header", "Menu",
+    "Node", "NodeSocket", "NodeTree",
+    "UIList", "RenderEngine",
+    "Gizmo", "GizmoGroup",
+}
+_FRAMEWORK_BASE_TYPES = {"ExpandableUi"}
+# keep in sync with common/class_loader/auto_load.py
+_REGISTRATION_MANIFEST_FILE = "registration_manifest.json"
+_REGISTRATION_MANIFEST_VERSION = 1
 # 默认使用的插件模板 不要轻易修改
 _ADDON_TEMPLATE = "sample_addon"
 _ADDONS_FOLDER = "addons"
 _ADDON_ROOT = os.path.join(PROJECT_ROOT, _ADDONS_FOLDER)
 
-# Install fake bpy module only when user have configured the blender executable path
-# 仅在用户配置了Blender可执行文件路径时安装fake bpy模块 避免在非Blender环境下安装fake bpy模块(如CICD流程中)
-if os.path.isfile(BLENDER_EXE_PATH):
-    install_fake_bpy(BLENDER_EXE_PATH)
+
+# Importing the framework has no side effect, Blender is only run and the packages are only installed by the code
+# paths needing them
+# 导入框架没有副作用 只有需要时才运行Blender或安装依赖
+
+
+def get_framework_requirements() -> list:
+    # (module name, package name) of the packages the framework needs for creating and testing addons
+    requirements = [("watchdog", "watchdog")]
+    if sys.version_info < (3, 11):
+        # tomllib was added in python3.11
+        requirements.append(("toml", "toml"))
+    # Install fake bpy module only when user have configured the blender executable path
+    # 仅在用户配置了Blender可执行文件路径时安装fake bpy模块 避免在非Blender环境下安装fake bpy模块(如CICD流程中)
+    if os.path.isfile(settings.blender_exe_path):
+        requirements.append(("bpy", get_fake_bpy_package(settings.blender_exe_path)))
+    return requirements
+
+
+def provision_framework_dependencies(requirements: list = None):
+    # Install the missing dependencies (all the framework requirements by default) at once from the wheels folder or
+    # the configured index, skipped once installed
+    # 一次性从wheels文件夹或配置的包索引安装缺少的依赖 安装完成后不再检查
+    if requirements is None:
+        requirements = get_framework_requirements()
+    pip_args = get_pip_source_args(os.path.join(PROJECT_ROOT, _WHEELS_PATH), settings.dependency_index_url,
+                                   settings.offline_dependencies)
+    provision_dependencies(requirements, pip_args)
 
 
 def new_addon(addon_name: str):
@@ -49,19 +95,22 @@ def new_addon(addon_name: str):
         raise ValueError("Addon already exists: " + addon_name)
     if not bool(_addon_namespace_pattern.match(addon_name)):
         raise ValueError("Invalid addon name: " + addon_name + " Please name it as a python package name")
+    provision_framework_dependencies()
     shutil.copytree(os.path.join(_ADDON_ROOT, _ADDON_TEMPLATE), new_addon_path)
 
-    all_template_file = search_files(new_addon_path, {".py", ".toml"})
+    all_template_file = search_files(new_addon_path, {".py", ".toml"}, DEFAULT_EXCLUDED_FOLDERS)
     for py_file in all_template_file:
         content = read_utf8(py_file).replace(_ADDON_TEMPLATE, addon_name)
         write_utf8(py_file, content)
 
 
-def test_addon(addon_name, enable_watch=True):
+def test_addon(addon_name, enable_watch=True, selective_reload=True, show_timing=True):
     init_file = get_init_file_path(addon_name)
+    provision_framework_dependencies()
     if not enable_watch:
         print('Do not auto reload addon when file changed')
-    start_test(init_file, addon_name, enable_watch=enable_watch)
+    start_test(init_file, addon_name, enable_watch=enable_watch, selective_reload=selective_reload,
+               show_timing=show_timing)
 
 
 def get_init_file_path(addon_name):
@@ -77,50 +126,130 @@ def get_init_file_path(addon_name):
 start_up_command = """
 import bpy
 from bpy.app.handlers import persistent
+import json
 import os
+import socket
 import sys
 existing_addon_md5 = ""
+reload_channel = None
+reload_buffer = b""
 try:
     bpy.ops.preferences.addon_enable(module="{addon_name}")
 except Exception as e:
     print("Addon enable failed:", e)
 
-def watch_update_tick():
-    global existing_addon_md5
+def read_addon_md5():
     if os.path.exists("{addon_signature}"):
         with open("{addon_signature}", "r") as f:
-            addon_md5 = f.read()
-        if existing_addon_md5 == "":
-            existing_addon_md5 = addon_md5
-        elif existing_addon_md5 != addon_md5:
-            print("Addon file changed, start to update the addon")
-            try:
-                bpy.ops.preferences.addon_disable(module="{addon_name}")
-                all_modules = sys.modules
-                all_modules = dict(sorted(all_modules.items(),key= lambda x:x[0])) #sort them
-                for k,v in all_modules.items():
-                    if k.startswith("{addon_name}"):
-                        del sys.modules[k]
-                bpy.ops.preferences.addon_enable(module="{addon_name}")
-            except Exception as e:
-                print("Addon update failed:", e)
-            existing_addon_md5 = addon_md5
-            print("Addon updated")
-    return 1.0
+            return f.read()
+    return ""
+
+def reload_addon_modules(module_names):
+    # reload only the given modules, return False if the whole addon has to be reloaded
+    auto_load = sys.modules.get("{addon_name}.common.class_loader.auto_load")
+    if auto_load is None or not hasattr(auto_load, "reload_modules"):
+        return False
+    try:
+        return auto_load.reload_modules(module_names)
+    except Exception as e:
+        print("Failed to reload the changed modules:", e)
+        return False
+
+def reload_addon(changed_modules, modules_to_reload=None):
+    print("Addon file changed, start to update the addon")
+    if changed_modules:
+        print("Changed modules:", ", ".join(changed_modules))
+    if {selective_reload} and modules_to_reload:
+        if reload_addon_modules(modules_to_reload):
+            print("Addon updated, reloaded modules:", ", ".join(modules_to_reload))
+            return
+        print("Registration changed, reload the whole addon")
+    try:
+        bpy.ops.preferences.addon_disable(module="{addon_name}")
+        all_modules = sys.modules
+        all_modules = dict(sorted(all_modules.items(),key= lambda x:x[0])) #sort them
+        for k,v in all_modules.items():
+            if k.startswith("{addon_name}"):
+                del sys.modules[k]
+        bpy.ops.preferences.addon_enable(module="{addon_name}")
+    except Exception as e:
+        print("Addon update failed:", e)
+    print("Addon updated")
+
+def check_addon_md5():
+    global existing_addon_md5
+    addon_md5 = read_addon_md5()
+    if addon_md5 != "" and existing_addon_md5 != addon_md5:
+        existing_addon_md5 = addon_md5
+        reload_addon(None)
+
+def connect_reload_channel():
+    global reload_channel
+    if {reload_port} == 0:
+        return
+    try:
+        reload_channel = socket.create_connection(("127.0.0.1", {reload_port}), timeout=1.0)
+        reload_channel.setblocking(False)
+    except OSError as e:
+        print("Reload channel not available, watching the addon signature file instead:", e)
+        reload_channel = None
+
+def receive_reload_messages():
+    # read every pending message, the channel is closed when the framework is gone
+    global reload_channel, reload_buffer
+    while reload_channel is not None:
+        try:
+            data = reload_channel.recv(65536)
+        except BlockingIOError:
+            break
+        except OSError:
+            data = b""
+        if not data:
+            print("Reload channel closed, watching the addon signature file instead")
+            reload_channel.close()
+            reload_channel = None
+            break
+        reload_buffer += data
+    lines = reload_buffer.split(b"\\n")
+    reload_buffer = lines.pop()
+    return [json.loads(line) for line in lines if line]
+
+def watch_update_tick():
+    global existing_addon_md5
+    if reload_channel is None:
+        # fall back to polling the signature file
+        check_addon_md5()
+        return 1.0
+    messages = receive_reload_messages()
+    if len(messages) > 0 and messages[-1]["signature"] != existing_addon_md5:
+        existing_addon_md5 = messages[-1]["signature"]
+        # the modules to reload are listed in reload order, which is only known for a single update
+        reload_addon(sorted(set(module for message in messages for module in message["modules"])),
+                     messages[0].get("reload") if len(messages) == 1 else None)
+    return 0.05
 
 @persistent
 def register_watch_update_tick(dummy):
     print("Watching for addon update...")
     bpy.app.timers.register(watch_update_tick)
 
+existing_addon_md5 = read_addon_md5()
+connect_reload_channel()
+# catch up with the updates made before the channel is connected
+check_addon_md5()
 register_watch_update_tick(None)
 bpy.app.handlers.load_post.append(register_watch_update_tick)
 """
 
 
-def start_test(init_file, addon_name, enable_watch=True):
+def start_test(init_file, addon_name, enable_watch=True, selective_reload=True, show_timing=True):
     update_addon_for_test(init_file, addon_name)
-    test_addon_path = os.path.normpath(os.path.join(BLENDER_ADDON_PATH, addon_name))
+    test_addon_path = os.path.normpath(os.path.join(settings.blender_addon_path, addon_name))
+    # auto_load prints how long each module import and class registration took when the addon is enabled
+    # 启用插件时打印各模块导入与各类注册的耗时
+    blender_env = dict(os.environ)
+    if show_timing:
+        blender_env[TIMING_ENV_VAR] = "1"
 
     if not enable_watch:
         def exit_handler():
@@ -130,20 +259,33 @@ def start_test(init_file, addon_name, enable_watch=True):
         atexit.register(exit_handler)
         try:
             execute_blender_script(
-                [BLENDER_EXE_PATH, "--python-use-system-env", "--python-expr",
-                 f"import bpy\nbpy.ops.preferences.addon_enable(module=\"{addon_name}\")"], test_addon_path)
+                [settings.blender_exe_path, "--python-use-system-env", "--python-expr",
+                 f"import bpy\nbpy.ops.preferences.addon_enable(module=\"{addon_name}\")"], test_addon_path,
+                env=blender_env)
         finally:
             exit_handler()
         return
 
+    # Push reload messages to Blender through a local socket, Blender falls back to polling the signature file if
+    # the channel is not available
+    # 通过本地socket通知Blender更新插件，若不可用则Blender会退回到轮询签名文件
+    try:
+        reload_channel = ReloadChannel()
+    except OSError as e:
+        print("Failed to open the reload channel, Blender will poll the addon signature file instead:", e)
+        reload_channel = None
+
     # start_watch_for_update(init_file, addon_name)
-    stop_event = threading.Event()
-    thread = threading.Thread(target=start_watch_for_update, args=(init_file, addon_name, stop_event))
+    change_collector = FileChangeCollector()
+    thread = threading.Thread(target=start_watch_for_update,
+                              args=(init_file, addon_name, change_collector, reload_channel))
     thread.start()
 
     def exit_handler():
-        stop_event.set()
+        change_collector.stop()
         thread.join()
+        if reload_channel is not None:
+            reload_channel.close()
         if os.path.exists(test_addon_path):
             shutil.rmtree(test_addon_path)
 
@@ -151,21 +293,67 @@ def start_test(init_file, addon_name, enable_watch=True):
 
     python_script = start_up_command.format(addon_name=addon_name,
                                             addon_signature=os.path.join(test_addon_path,
-                                                                         _addon_md5__signature).replace("\\", "/"))
+                                                                         _addon_md5__signature).replace("\\", "/"),
+                                            reload_port=reload_channel.port if reload_channel is not None else 0,
+                                            selective_reload=selective_reload)
 
     try:
-        execute_blender_script([BLENDER_EXE_PATH, "--python-use-system-env", "--python-expr", python_script],
-                               test_addon_path)
+        execute_blender_script([settings.blender_exe_path, "--python-use-system-env", "--python-expr", python_script],
+                               test_addon_path, env=blender_env)
     finally:
         exit_handler()
 
 
+class ReloadChannel:
+    """
+    A loopback TCP server the Blender started for testing connects to. Reload messages are pushed to Blender as soon as
+    the test addon is updated, one json object per line.
+    """
+
+    def __init__(self):
+        import socket
+        self._server = socket.create_server(("127.0.0.1", 0))
+        self.port = self._server.getsockname()[1]
+        self._clients = []
+        self._lock = threading.Lock()
+        threading.Thread(target=self._accept_clients, daemon=True).start()
+
+    def _accept_clients(self):
+        while True:
+            try:
+                client, _ = self._server.accept()
+            except OSError:
+                # the server is closed
+                return
+            with self._lock:
+                self._clients.append(client)
+
+    # send message to every connected client, return whether any client received it
+    def push(self, message: dict) -> bool:
+        data = (json.dumps(message) + "\n").encode("utf-8")
+        with self._lock:
+            for client in list(self._clients):
+                try:
+                    client.sendall(data)
+                except OSError:
+                    client.close()
+                    self._clients.remove(client)
+            return len(self._clients) > 0
+
+    def close(self):
+        self._server.close()
+        with self._lock:
+            for client in self._clients:
+                client.close()
+            self._clients.clear()
+
+
 # This is the only corner case need to handle
 _addon_on_init_file = os.path.abspath(os.path.join(PROJECT_ROOT, "__init__.py"))
 
 
-def execute_blender_script(args, addon_path):
-    process = subprocess.Popen(args, stderr=subprocess.PIPE, text=True, encoding="utf-8")
+def execute_blender_script(args, addon_path, env=None):
+    process = subprocess.Popen(args, stderr=subprocess.PIPE, text=True, encoding="utf-8", env=env)
     try:
         for line in process.stderr:
             line: str
@@ -180,6 +368,13 @@ def execute_blender_script(args, addon_path):
 
 
 def read_ext_config(addon_config_file):
+    try:
+        # added in python3.11
+        import tomllib
+    except ImportError:
+        # for python3.10 and below
+        provision_framework_dependencies([("toml", "toml")])
+        import toml
     with open(addon_config_file, 'r', encoding='utf-8') as f:
         try:
             addon_config = tomllib.loads(f.read())
@@ -189,11 +384,22 @@ def read_ext_config(addon_config_file):
 
 
 def release_addon(target_init_file, addon_name,
-                  release_dir=DEFAULT_RELEASE_DIR,
+                  release_dir=None,
                   need_zip=True,
-                  is_extension=IS_EXTENSION,
+                  is_extension=None,
                   with_timestamp=False,
-                  with_version=False):
+                  with_version=False,
+                  incremental=False,
+                  dependency_workers=1,
+                  compress_level=DEFAULT_COMPRESS_LEVEL,
+                  import_graph_cache=None,
+                  changed_files=None,
+                  tree_shaking=False):
+    # release_dir and is_extension default to the configuration in main.py/config.ini
+    if release_dir is None:
+        release_dir = settings.default_release_dir
+    if is_extension is None:
+        is_extension = settings.is_extension
     # if release dir is under PROJECT_ROOT, it's not allowed
     if is_subdirectory(release_dir, PROJECT_ROOT):
         # 不要将插件发布目录设置在当前项目内
@@ -214,118 +420,876 @@ def release_addon(target_init_file, addon_name,
     if not os.path.isdir(release_dir):
         Path(release_dir).mkdir(parents=True, exist_ok=True)
 
-    # remove the folder if already exists
+    addon_config_file = os.path.join(_ADDON_ROOT, addon_name, _ADDON_MANIFEST_FILE)
+    addon_config = {}
+    if os.path.exists(addon_config_file) and is_extension:
+        addon_config = read_ext_config(addon_config_file)
+
     release_folder = os.path.join(release_dir, addon_name)
-    if os.path.exists(release_folder):
-        shutil.rmtree(release_folder)
-    os.mkdir(release_folder)
+    # a shared import_graph_cache is saved by its owner
+    owns_import_graph_cache = import_graph_cache is None
+    if owns_import_graph_cache:
+        import_graph_cache = ImportGraphCache(get_import_graph_cache_path(release_dir))
+    release_files = collect_release_files(target_init_file, addon_name, import_graph_cache, dependency_workers,
+                                          tree_shaking)
+    if owns_import_graph_cache:
+        import_graph_cache.save()
+        print(import_graph_cache.report())
+    if tree_shaking:
+        write_tree_shaking_report(release_dir, addon_name, release_files)
+    wheel_files = collect_wheel_files(addon_config) if need_zip else {}
+
+    # The release folder is only staged when it is not zipped or when it is kept for incremental releases,
+    # otherwise the files are written into the zip file directly
+    # 仅在不压缩或增量发布时生成发布目录，否则直接将文件写入压缩包
+    stage_release_folder = not need_zip or incremental
+    manifest_file = get_release_manifest_path(release_dir, addon_name)
+    if incremental:
+        # 增量发布：保留上一次的发布目录，只更新内容发生变化的文件
+        manifest = load_release_manifest(manifest_file)
+    else:
+        # remove the folder if already exists
+        manifest = {}
+        if os.path.exists(release_folder):
+            shutil.rmtree(release_folder)
+    if stage_release_folder:
+        if not os.path.isdir(release_folder):
+            os.mkdir(release_folder)
+        new_manifest = sync_release_folder(release_folder, release_files, wheel_files, manifest, is_extension,
+                                           changed_files)
+        save_release_manifest(manifest_file, new_manifest)
+
+    real_addon_name = "{addon_name}".format(addon_name=release_folder)
+    if is_extension:
+        real_addon_name = f"{real_addon_name}_ext"
+    if with_version:
+        _version: str
+        if not is_extension:
+            bl_info = get_addon_info(target_init_file)
+            if bl_info is not None:
+                _version = '.'.join([str(x) for x in bl_info['version']])
+            else:
+                raise ValueError("bl_info not found in:", target_init_file)
+        else:
+            if "version" in addon_config:
+                _version = addon_config["version"]
+            else:
+                raise ValueError("version not found in:", addon_config_file)
+        real_addon_name = f"{real_addon_name}_V{_version}"
+    if with_timestamp:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        real_addon_name = f"{real_addon_name}_{timestamp}"
+
+    released_addon_path = os.path.abspath(os.path.join(release_dir, real_addon_name) + ".zip")
+    # zip the addon
+    if need_zip:
+        if stage_release_folder:
+            zip_folder(release_folder, real_addon_name, is_extension, compress_level)
+        else:
+            zip_release_files(release_files, wheel_files, real_addon_name, release_folder, is_extension,
+                              compress_level)
+        print("Add on released:", released_addon_path)
 
-    bootstrap_init_file = generate_bootstrap_init_file(addon_name, get_addon_info(target_init_file))
-    write_utf8(os.path.join(release_folder, "__init__.py"), bootstrap_init_file)
+    return released_addon_path
+
+
+def collect_release_files(target_init_file, addon_name, import_graph_cache=None, dependency_workers=1,
+                          tree_shaking=False) -> dict:
+    """
+    Collect every file that should be shipped with the addon.
+    Returns a dict mapping the relative path inside the release folder to the source file path in the workspace.
+    The bootstrap __init__.py is generated, its source is the generated content wrapped in _GeneratedFile.
+    If tree_shaking is True, only the python files of the addon folder reachable from its __init__.py or from the
+    modules auto_load registers something from are shipped, see get_tree_shaking_roots.
+    收集所有需要发布的文件，返回 发布目录中的相对路径 -> 工作空间中的源文件路径
+    """
+    release_files = {}
+    bl_info = get_addon_info(target_init_file)
+    release_files["__init__.py"] = _GeneratedFile(generate_bootstrap_init_file(addon_name, bl_info))
 
-    # shutil.copyfile(target_init_file, os.path.join(release_folder, "__init__.py"))
     # 将target_init_file同级的其他非py文件复制到发布目录 如 toml xml等可能跟插件有关的配置文件
     for file in os.listdir(os.path.dirname(target_init_file)):
         file_path = os.path.join(os.path.dirname(target_init_file), file)
         if os.path.isdir(file_path) or file.endswith(".py"):
             continue
-        shutil.copy(file_path, release_folder)
+        release_files[file] = file_path
 
     # 将插件文件夹复制到发布目录
-    shutil.copytree(os.path.join(_ADDON_ROOT, addon_name), os.path.join(release_folder, _ADDONS_FOLDER, addon_name))
-    shutil.copyfile(os.path.join(_ADDON_ROOT, "__init__.py"),
-                    os.path.join(release_folder, _ADDONS_FOLDER, "__init__.py"))
+    addon_folder = os.path.join(_ADDON_ROOT, addon_name)
+    all_addon_files = search_files(addon_folder, set(), DEFAULT_EXCLUDED_FOLDERS)
+    for file in all_addon_files:
+        release_files[os.path.relpath(file, PROJECT_ROOT)] = file
+    release_files[os.path.join(_ADDONS_FOLDER, "__init__.py")] = os.path.join(_ADDON_ROOT, "__init__.py")
 
-    all_py_files = search_files(os.path.join(_ADDON_ROOT, addon_name), {".py"})
     # 对插件文件夹中的每一个py文件进行分析，找到每个py文件中依赖的其他py文件
     visited_py_files = set()
-    for py_file in all_py_files:
-        visited_py_files.add(os.path.abspath(py_file))
+    for py_file in all_addon_files:
+        if is_filename_postfix_in(py_file, {".py"}):
+            visited_py_files.add(os.path.abspath(py_file))
     # 注意不要漏掉__init__.py文件
     visited_py_files.add(os.path.abspath(os.path.join(_ADDON_ROOT, "__init__.py")))
 
-    dependencies = find_all_dependencies(list(visited_py_files), PROJECT_ROOT)
+    if tree_shaking:
+        # 只发布从插件入口可达的py文件
+        root_files = get_tree_shaking_roots(target_init_file, visited_py_files)
+    else:
+        root_files = visited_py_files
+    dependencies = find_all_dependencies(list(root_files), PROJECT_ROOT, import_graph_cache, dependency_workers)
+    if tree_shaking:
+        reachable_files = {os.path.abspath(dependency) for dependency in dependencies}
+        # the packages of the shipped modules are shipped too, otherwise auto_load can not walk into them. Importing a
+        # module runs the __init__.py of its packages, so their imports are followed until no package is added
+        # 被发布模块所在包的__init__.py也会被发布，并继续分析其导入的模块
+        while True:
+            package_files = set()
+            for file in reachable_files:
+                folder = os.path.dirname(file)
+                while is_subdirectory(folder, addon_folder):
+                    package_files.add(os.path.join(folder, "__init__.py"))
+                    folder = os.path.dirname(folder)
+            new_package_files = [file for file in package_files - reachable_files if os.path.isfile(file)]
+            if len(new_package_files) == 0:
+                break
+            package_dependencies = find_all_dependencies(new_package_files, PROJECT_ROOT, import_graph_cache,
+                                                         dependency_workers)
+            dependencies = list(dependencies) + list(package_dependencies)
+            reachable_files.update(os.path.abspath(dependency) for dependency in package_dependencies)
+        for py_file in visited_py_files - reachable_files:
+            release_files.pop(os.path.relpath(py_file, PROJECT_ROOT), None)
     for dependency in dependencies:
         dependency = os.path.abspath(dependency)
         if dependency in visited_py_files:
             continue
-        visited_py_files.add(dependency)
-        target_path = os.path.join(release_folder, os.path.relpath(dependency, PROJECT_ROOT))
-        if not os.path.exists(os.path.dirname(target_path)):
-            os.makedirs(os.path.dirname(target_path))
-        shutil.copy(dependency, os.path.join(release_folder, os.path.relpath(dependency, PROJECT_ROOT)))
+        release_files[os.path.relpath(dependency, PROJECT_ROOT)] = dependency
+
+    # pyc files are auto generated, they are never released
+    release_files = {path: source for path, source in release_files.items() if not is_filename_postfix_in(path, {"pyc"})}
+    # auto_load registers the classes listed in the manifest instead of discovering them when the addon is enabled
+    registration_manifest = generate_registration_manifest(release_files)
+    if registration_manifest is not None:
+        release_files[_REGISTRATION_MANIFEST_FILE] = _GeneratedFile(registration_manifest)
+    # 将插件的翻译字典编译为按语言拆分的目录 插件启用时只读取当前语言
+    release_files.update(generate_translation_catalogs(addon_name))
+    return release_files
+
+
+def generate_translation_catalogs(addon_name) -> dict:
+    """
+    Compile the dictionary defined in the i18n/dictionary.py of the addon into translation catalogs, see
+    common/i18n/catalog.py. Returns a dict mapping the relative path of each catalog inside the release folder to its
+    content. The dictionary module is run in the framework process, if it can not be run (e.g. it imports bpy) no
+    catalog is generated and the released addon loads the dictionary module instead.
+    """
+    import runpy
+    dictionary_file = os.path.join(_ADDON_ROOT, addon_name, "i18n", "dictionary.py")
+    if not os.path.isfile(dictionary_file):
+        return {}
+    try:
+        dictionary = runpy.run_path(dictionary_file)["dictionary"]
+    except Exception as e:
+        print("Failed to compile the translation catalogs, the dictionary module will be loaded instead:", e)
+        return {}
+    catalog_folder = os.path.join(_ADDONS_FOLDER, addon_name, "i18n", CATALOG_FOLDER)
+    return {os.path.join(catalog_folder, file_name): _GeneratedFile(content)
+            for file_name, content in compile_catalogs(dictionary).items()}
+
+
+def get_tree_shaking_roots(target_init_file, addon_py_files: set) -> set:
+    """
+    The python files tree shaking starts from: the __init__.py of the addon and of the addons folder, the i18n
+    package of the addon (loaded by name with load_translations), and every file in addon_py_files auto_load would
+    register something from, that is a file defining a subclass of a registrable bpy type or ExpandableUi (directly
+    or through other classes, see ClassBaseResolver) or a register function. A file defining a class whose bases can
+    not be resolved is kept as well.
+    Modules only imported dynamically (importlib, __import__) are not found.
+    """
+    addon_folder = os.path.dirname(os.path.abspath(target_init_file))
+    roots = {os.path.abspath(target_init_file), os.path.abspath(os.path.join(_ADDON_ROOT, "__init__.py"))}
+    # the dictionary module is imported by load_translations when no translation catalog is released
+    for i18n_file in ("__init__.py", "dictionary.py"):
+        if os.path.isfile(os.path.join(addon_folder, "i18n", i18n_file)):
+            roots.add(os.path.join(addon_folder, "i18n", i18n_file))
+    resolver = ClassBaseResolver(PROJECT_ROOT)
+    for py_file in addon_py_files:
+        if not os.path.isfile(py_file):
+            continue
+        classes, functions, _, _ = get_module_definitions(py_file)
+        if "register" in functions or any(resolver.is_registrable(py_file, cls["name"])
+                                          or resolver.is_framework_class(py_file, cls["name"])
+                                          or resolver.is_unresolved(py_file, cls["name"]) for cls in classes):
+            roots.add(py_file)
+    return roots
+
+
+def get_dotted_name(node):
+    # bpy.types.Panel -> "bpy.types.Panel", a subscripted base (Generic[T]) is its value, None for other expressions
+    import ast
+    if isinstance(node, ast.Subscript):
+        return get_dotted_name(node.value)
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        value = get_dotted_name(node.value)
+        return None if value is None else f"{value}.{node.attr}"
+    return None
+
+
+# py file -> (size, modification time, definitions), the files are parsed again only when they change
+_module_definitions_cache = {}
+
+
+def get_module_definitions(py_file: str):
+    """
+    Return (classes, functions, imported_names, aliases) defined at the module level of py_file, that is what
+    auto_load finds in the module.
+    Each class is a dict with its name, its bases as written (dotted names such as "Operator" or "bpy.types.Panel",
+    None for an expression that is not a name), the names of the classes its PointerProperty and CollectionProperty
+    annotations point to, and its bl_idname, bl_parent_id and _reg_order (from the class body or the reg_order
+    decorator) when they are constants. functions is the set of the function names.
+    imported_names maps the local name of every import to (module, imported name), imported name is None when a
+    module itself is imported (import x.y as z, from . import x). aliases maps the names assigned a dotted name
+    (PanelBase = bpy.types.Panel) to that name.
+    An operator created with lazy_operator (common/class_loader/lazy_operator.py) and assigned to a name is returned
+    as a class without bases, its "lazy" item is (implementation module, class name) as written in the call.
+    """
+    import ast
+    stat = os.stat(py_file)
+    cached = _module_definitions_cache.get(py_file)
+    if cached is not None and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+        return cached[2]
+
+    def get_name(node):
+        if isinstance(node, ast.Name):
+            return node.id
+        if isinstance(node, ast.Attribute):
+            return node.attr
+        return None
+
+    def get_constant(node):
+        return node.value if isinstance(node, ast.Constant) else None
+
+    classes = []
+    functions = set()
+    imported_names = {}
+    aliases = {}
+    # module level statements, including the ones in if/try/with blocks
+    to_visit = list(ast.parse(read_utf8(py_file), filename=py_file).body)
+    while to_visit:
+        node = to_visit.pop(0)
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            functions.add(node.name)
+        elif isinstance(node, ast.ImportFrom):
+            for alias in node.names:
+                if node.module:
+                    imported_names[alias.asname or alias.name] = (node.module, alias.name)
+                else:
+                    # from . import xxx imports a module next to py_file
+                    imported_names[alias.asname or alias.name] = (alias.name, None)
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.asname:
+                    imported_names[alias.asname] = (alias.name, None)
+                else:
+                    # import a.b binds a
+                    imported_names[alias.name.split(".")[0]] = (alias.name.split(".")[0], None)
+        elif isinstance(node, ast.ClassDef):
+            cls = {"name": node.name, "bases": [get_dotted_name(base) for base in node.bases], "properties": set(),
+                   "bl_idname": None, "bl_parent_id": None, "reg_order": None}
+            for decorator in node.decorator_list:
+                if isinstance(decorator, ast.Call) and get_name(decorator.func) == "reg_order" and decorator.args:
+                    cls["reg_order"] = get_constant(decorator.args[0])
+            for statement in node.body:
+                if isinstance(statement, ast.AnnAssign) and isinstance(statement.annotation, ast.Call):
+                    if get_name(statement.annotation.func) in ("PointerProperty", "CollectionProperty"):
+                        for keyword in statement.annotation.keywords:
+                            if keyword.arg == "type" and get_name(keyword.value) is not None:
+                                cls["properties"].add(get_name(keyword.value))
+                elif isinstance(statement, ast.Assign) and len(statement.targets) == 1:
+                    target = get_name(statement.targets[0])
+                    if target in ("bl_idname", "bl_parent_id"):
+                        cls[target] = get_constant(statement.value)
+                    elif target == "_reg_order":
+                        cls["reg_order"] = get_constant(statement.value)
+            classes.append(cls)
+        elif (isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name)
+              and isinstance(node.value, ast.Call) and get_name(node.value.func) == "lazy_operator"
+              and len(node.value.args) >= 2):
+            keywords = {keyword.arg: keyword.value for keyword in node.value.keywords}
+            bl_idname = keywords.get("bl_idname", node.value.args[3] if len(node.value.args) > 3 else None)
+            classes.append({"name": node.targets[0].id, "bases": [], "properties": set(),
+                            "bl_idname": get_constant(bl_idname), "bl_parent_id": None, "reg_order": None,
+                            "lazy": (get_constant(node.value.args[0]), get_constant(node.value.args[1]))})
+        elif (isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name)
+              and get_dotted_name(node.value) is not None and not isinstance(node.value, ast.Subscript)):
+            aliases[node.targets[0].id] = get_dotted_name(node.value)
+        elif isinstance(node, ast.If):
+            to_visit.extend(node.body + node.orelse)
+        elif isinstance(node, ast.Try):
+            to_visit.extend(node.body + node.orelse + node.finalbody)
+            for handler in node.handlers:
+                to_visit.extend(handler.body)
+        elif isinstance(node, ast.With):
+            to_visit.extend(node.body)
+    result = (classes, functions, imported_names, aliases)
+    _module_definitions_cache[py_file] = (stat.st_size, stat.st_mtime_ns, result)
+    return result
+
+
+class ClassBaseResolver:
+    """
+    Follow the bases of the classes found by get_module_definitions to where they are defined, through module level
+    aliases (PanelBase = bpy.types.Panel) and imports (from bpy.types import Operator as Op, from .base import BaseOp
+    as B), so a renamed base is recognised the same way auto_load recognises it with issubclass.
+    The ancestors of a class are ("bpy", type name) for the bpy.types types, ("class", (file, class name)) for the
+    classes of the project, ("external", name) for builtins and the standard library, and ("unresolved", name) for
+    anything else (third party modules, star imports, classes created dynamically...).
+    静态解析类的基类 支持别名与导入重命名
+    """
+
+    def __init__(self, project_root: str):
+        self.project_root = project_root
+        self._ancestors = {}
+
+    def get_ancestors(self, py_file: str, class_name: str) -> set:
+        key = (os.path.abspath(py_file), class_name)
+        if key not in self._ancestors:
+            # a class deriving from itself through imports is invalid python, stop there
+            self._ancestors[key] = set()
+            self._ancestors[key] = self._find_ancestors(*key)
+        return self._ancestors[key]
+
+    def is_registrable(self, py_file: str, class_name: str) -> bool:
+        return any(kind == "bpy" and name in _REGISTRABLE_BASE_TYPES
+                   for kind, name in self.get_ancestors(py_file, class_name))
+
+    def is_framework_class(self, py_file: str, class_name: str) -> bool:
+        return any(kind == "class" and name[1] in _FRAMEWORK_BASE_TYPES
+                   for kind, name in self.get_ancestors(py_file, class_name))
+
+    @staticmethod
+    def is_registrable_ancestry(ancestors: set) -> bool:
+        # True if a class with these ancestors is registered by auto_load, or might be because of an unknown ancestor
+        return any((kind == "bpy" and name in _REGISTRABLE_BASE_TYPES) or kind == "unresolved"
+                   or (kind == "class" and name[1] in _FRAMEWORK_BASE_TYPES) for kind, name in ancestors)
+
+    def is_unresolved(self, py_file: str, class_name: str) -> bool:
+        # True if the class might be registrable or a framework class, but some of its ancestors are unknown
+        return (any(kind == "unresolved" for kind, _ in self.get_ancestors(py_file, class_name))
+                and not self.is_registrable(py_file, class_name) and not self.is_framework_class(py_file, class_name))
+
+    def _find_ancestors(self, py_file: str, class_name: str) -> set:
+        cls = next((cls for cls in get_module_definitions(py_file)[0] if cls["name"] == class_name), None)
+        if cls is None:
+            return {("unresolved", class_name)}
+        if "lazy" in cls:
+            return {("bpy", "Operator")}
+        return self.get_bases_ancestors(py_file, cls["bases"])
+
+    def get_bases_ancestors(self, py_file: str, bases: list) -> set:
+        # the ancestors of a class with bases (dotted names, None for an expression) defined in py_file
+        ancestors = set()
+        for base in bases:
+            resolved = self.resolve(py_file, base) if base is not None else None
+            if resolved is None:
+                resolved = ("unresolved", base)
+            ancestors.add(resolved)
+            if resolved[0] == "class":
+                ancestors |= self.get_ancestors(*resolved[1])
+        return ancestors
+
+    def resolve(self, py_file: str, reference: str, seen: set = None):
+        """
+        Return what the dotted name reference used in py_file refers to, ("class", (file, class name)), ("bpy", type
+        name) or ("external", name), None if it can not be resolved.
+        """
+        seen = set() if seen is None else seen
+        if (py_file, reference) in seen:
+            return None
+        seen.add((py_file, reference))
+        classes, _, imported_names, aliases = get_module_definitions(py_file)
+        head, _, rest = reference.partition(".")
+        if any(cls["name"] == head for cls in classes):
+            # nested classes are not followed
+            return ("class", (os.path.abspath(py_file), head)) if not rest else None
+        if head in aliases:
+            return self.resolve(py_file, ".".join(filter(None, (aliases[head], rest))), seen)
+        if head in imported_names:
+            module, name = imported_names[head]
+            return self._resolve_in_module(py_file, module, ".".join(filter(None, (name, rest))), seen)
+        if rest == "" and hasattr(builtins, head):
+            return "external", head
+        return None
+
+    def _resolve_in_module(self, py_file: str, module: str, reference: str, seen: set):
+        # reference is a dotted name defined in module, module is imported in py_file
+        full_name = f"{module}.{reference}" if reference else module
+        if full_name.startswith("bpy.types.") and full_name.count(".") == 2:
+            return "bpy", full_name.split(".")[2]
+        module_files = resolve_module_path(module, py_file, self.project_root)
+        if len(module_files) == 0:
+            if module.split(".")[0] in getattr(sys, "stdlib_module_names", ()):
+                return "external", full_name
+            return None
+        if reference == "":
+            return None
+        for module_file in module_files:
+            resolved = self.resolve(module_file, reference, seen)
+            if resolved is not None:
+                return resolved
+        # the first part of reference might be a submodule of the package
+        submodule, _, rest = reference.partition(".")
+        if rest:
+            return self._resolve_in_module(py_file, f"{module}.{submodule}", rest, seen)
+        return None
+
+
+# py file -> (size, modification time, dynamic classes)
+_dynamic_classes_cache = {}
+_LAZY_OPERATOR_FILE = os.path.join(PROJECT_ROOT, "common", "class_loader", "lazy_operator.py")
 
-    remove_pyc_files(release_folder)
+
+def get_dynamic_classes(py_file: str) -> list:
+    """
+    Return (line, bases) of the classes py_file might create at run time, which get_module_definitions does not see: the
+    classes defined in a function (a factory returning them can bind them at the module level) and the classes created
+    with type(name, bases, namespace). bases are dotted names as in get_module_definitions, [None] if the bases of a
+    type() call are not a literal tuple.
+    """
+    import ast
+    stat = os.stat(py_file)
+    cached = _dynamic_classes_cache.get(py_file)
+    if cached is not None and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+        return cached[2]
+
+    tree = ast.parse(read_utf8(py_file), filename=py_file)
+    dynamic_classes = {}
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+            for child in ast.walk(node):
+                if isinstance(child, ast.ClassDef):
+                    dynamic_classes[id(child)] = (child.lineno, [get_dotted_name(base) for base in child.bases])
+        elif (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "type"
+              and len(node.args) == 3):
+            bases = node.args[1]
+            dynamic_classes[id(node)] = (node.lineno, [get_dotted_name(base) for base in bases.elts]
+                                         if isinstance(bases, ast.Tuple) else [None])
+    result = sorted(dynamic_classes.values(), key=lambda dynamic_class: dynamic_class[0])
+    _dynamic_classes_cache[py_file] = (stat.st_size, stat.st_mtime_ns, result)
+    return result
+
+
+def generate_registration_manifest(release_files: dict):
+    """
+    Generate the registration manifest of the release from the source of the released modules: the modules auto_load
+    has to import, the classes to register in registration order as (module, class name) pairs and the framework
+    classes. Module names are relative to the released addon package.
+    The order follows the same rules as auto_load: a class is registered after its base classes, the classes its
+    PointerProperty/CollectionProperty annotations point to and its bl_parent_id panel, otherwise by _reg_order.
+    Returns None, so no manifest is released and auto_load discovers the classes when the addon is enabled, if the
+    base of a class which might be registrable can not be resolved (see ClassBaseResolver), or if a module creates a
+    class which might be registrable dynamically (see get_dynamic_classes).
+    发布时静态分析需要注册的类及其注册顺序，插件启用时auto_load无需再动态查找
+    """
+    # auto_load only walks into packages
+    released_packages = {os.path.dirname(rel_path) for rel_path in release_files
+                         if os.path.basename(rel_path) == "__init__.py"}
+    modules = {}
+    # auto_load does not load packages, only the lazy operators declared in their __init__.py are registered
+    packages = set()
+    for rel_path, source in release_files.items():
+        if not rel_path.endswith(".py") or isinstance(source, _GeneratedFile):
+            continue
+        module_path = os.path.splitext(rel_path)[0]
+        if os.path.basename(rel_path) == "__init__.py":
+            module_path = os.path.dirname(rel_path)
+            if module_path == _ADDONS_FOLDER:
+                continue
+            packages.add(os.path.abspath(source))
+        folder = os.path.dirname(rel_path)
+        while folder and folder in released_packages:
+            folder = os.path.dirname(folder)
+        if folder == "":
+            modules[os.path.abspath(source)] = ".".join(module_path.split(os.sep))
+    definitions = {source: get_module_definitions(source) for source in modules}
+    for source in packages & set(definitions):
+        classes, _, imported_names, aliases = definitions[source]
+        definitions[source] = ([cls for cls in classes if "lazy" in cls], set(), imported_names, aliases)
+    # the implementation modules of the lazy operators are imported when the operators are used, not by auto_load
+    lazy_modules = set()
+    for source, (module_classes, _, _, _) in definitions.items():
+        package = modules[source] if source in packages else modules[source].rpartition(".")[0]
+        for cls in module_classes:
+            if "lazy" in cls and isinstance(cls["lazy"][0], str):
+                lazy_modules.add(importlib.util.resolve_name(cls["lazy"][0], package))
+    for source in [source for source, module in modules.items() if module in lazy_modules]:
+        del definitions[source]
+
+    resolver = ClassBaseResolver(PROJECT_ROOT)
+    # every class is identified by (source file, class name)
+    classes = {}
+    framework_classes = []
+    for source, (module_classes, _, _, _) in definitions.items():
+        for cls in module_classes:
+            if resolver.is_unresolved(source, cls["name"]):
+                print(f"Can not resolve the bases of {modules[source]}.{cls['name']}, "
+                      f"the classes to register will be discovered when the addon is enabled")
+                return None
+            if resolver.is_registrable(source, cls["name"]):
+                classes[(source, cls["name"])] = cls
+            if resolver.is_framework_class(source, cls["name"]):
+                framework_classes.append((modules[source], cls["name"]))
+        if os.path.abspath(source) == _LAZY_OPERATOR_FILE:
+            # its classes are the lazy operators found from the lazy_operator calls
+            continue
+        for line, bases in get_dynamic_classes(source):
+            if ClassBaseResolver.is_registrable_ancestry(resolver.get_bases_ancestors(source, bases)):
+                print(f"{modules[source]} creates a class which might be registered dynamically (line {line}), "
+                      f"the classes to register will be discovered when the addon is enabled")
+                return None
+    classes_by_name = {}
+    classes_by_idname = {}
+    for key, cls in classes.items():
+        classes_by_name.setdefault(cls["name"], []).append(key)
+        if cls["bl_idname"] is not None:
+            classes_by_idname[cls["bl_idname"]] = key
+
+    def find_class(source, name):
+        # a class of the module itself, a class imported by name, or the only class with that name
+        if (source, name) in classes:
+            return source, name
+        imported = definitions[source][2].get(name)
+        if imported is not None:
+            for module_path in resolve_module_path(imported[0], source, PROJECT_ROOT):
+                if (os.path.abspath(module_path), imported[1]) in classes:
+                    return os.path.abspath(module_path), imported[1]
+        candidates = classes_by_name.get(name, [])
+        return candidates[0] if len(candidates) == 1 else None
+
+    deps_dict = {}
+    for (source, name), cls in classes.items():
+        deps = {find_class(source, dependency) for dependency in cls["properties"]}
+        for base in cls["bases"]:
+            resolved = resolver.resolve(source, base) if base is not None else None
+            if resolved is not None and resolved[0] == "class" and resolved[1] in classes:
+                deps.add(resolved[1])
+        if cls["bl_parent_id"] is not None:
+            deps.add(classes_by_idname.get(cls["bl_parent_id"]))
+        deps_dict[(source, name)] = deps - {None, (source, name)}
+
+    ordered_classes = sort_by_dependencies(deps_dict, lambda key: (
+        classes[key]["reg_order"] if isinstance(classes[key]["reg_order"], (int, float)) else float("inf"),
+        modules[key[0]], key[1]), lambda key: f"{modules[key[0]]}.{key[1]}")
+    registered_modules = {modules[source] for source, _ in ordered_classes}
+    registered_modules.update(module for module, _ in framework_classes)
+    registered_modules.update(modules[source] for source, (_, functions, _, _) in definitions.items()
+                              if "register" in functions or "unregister" in functions)
+    return json.dumps({
+        "version": _REGISTRATION_MANIFEST_VERSION,
+        "modules": sorted(registered_modules),
+        "classes": [[modules[source], name] for source, name in ordered_classes],
+        "framework_classes": sorted(framework_classes),
+    }, indent=1)
+
+
+def get_tree_shaking_report_path(release_dir: str, addon_name: str) -> str:
+    return os.path.join(release_dir, _RELEASE_CACHE_FOLDER, _TREE_SHAKING_REPORT_FILE.format(addon_name=addon_name))
+
+
+def write_tree_shaking_report(release_dir: str, addon_name: str, release_files: dict):
+    # list the python files of the addon folder left out of the release
+    released_files = {os.path.abspath(source) for source in release_files.values()
+                      if not isinstance(source, _GeneratedFile)}
+    excluded_files = sorted(os.path.relpath(py_file, PROJECT_ROOT)
+                            for py_file in iter_files(os.path.join(_ADDON_ROOT, addon_name), {".py"},
+                                                      DEFAULT_EXCLUDED_FOLDERS)
+                            if os.path.abspath(py_file) not in released_files)
+    report_file = get_tree_shaking_report_path(release_dir, addon_name)
+    Path(os.path.dirname(report_file)).mkdir(parents=True, exist_ok=True)
+    write_utf8(report_file, "".join(f"{excluded_file}\n" for excluded_file in excluded_files))
+    print(f"Tree shaking excluded {len(excluded_files)} unreachable python files of {addon_name}, see {report_file}")
+    for excluded_file in excluded_files:
+        print("  ", excluded_file)
+
+
+def collect_wheel_files(addon_config: dict) -> dict:
+    # package whl files into extension
+    wheel_files = {}
+    for wheel_file in addon_config.get("wheels", []):
+        # You much put the .whl file directly under the wheels folder, not in a subfolder
+        # 你必须将.whl文件直接放在wheels文件夹下，而不是在子文件夹中
+        assert wheel_file.startswith("./wheels/") and wheel_file.count("/") == 2
+        wheel_source = os.path.join(PROJECT_ROOT, wheel_file)
+        if not os.path.exists(wheel_source):
+            raise ValueError("Wheel file not found:", wheel_source,
+                             ". Please download the required wheel file to the wheels folder.")
+        wheel_files[os.path.join(_WHEELS_PATH, os.path.basename(wheel_file))] = wheel_source
+    return wheel_files
+
+
+class _GeneratedFile(str):
+    # Content of a file generated by the framework instead of copied from the workspace
+    pass
+
+
+def sync_release_folder(release_folder: str, release_files: dict, wheel_files: dict, manifest: dict,
+                        is_extension: bool, changed_files=None) -> dict:
+    """
+    Bring release_folder up to date with release_files and wheel_files, return the new release manifest, which records
+    the md5 of the source and of the released content of every file.
+    A file is copied and its imports rewritten again only when its source content changed, its staged output was
+    touched, or the set of released modules (which decides how imports are rewritten) changed since the manifest was
+    written. The result is identical to a clean release.
+    If changed_files (absolute paths, e.g. reported by the file watcher) is given, other source files recorded in the
+    manifest are assumed unchanged and not read again.
+    根据发布清单只更新发生变化的文件，结果与完整发布一致
+    """
+    all_release_files = {**release_files, **wheel_files}
+    # the way imports are rewritten depends on the release mode and the released file tree
+    context = hashlib.md5(repr((is_extension, os.path.basename(release_folder),
+                                sorted(release_files.keys()))).encode("utf-8")).hexdigest()
+    same_context = manifest.get("context") == context
+    previous_files = manifest.get("files", {})
+
+    # remove files which are no longer part of the release
+    for file in search_files(release_folder, set()):
+        if os.path.relpath(file, release_folder) not in all_release_files:
+            os.remove(file)
     removed_path = 1
     while removed_path > 0:
         removed_path = remove_empty_folders(release_folder)
 
-    # 必须先将绝对导入转换为相对导入，否则enhance_import_for_py_files一步会改变绝对导入的路径导致出错
+    module_index, all_py_modules = get_release_module_index(release_files)
+    files = {}
+    for rel_path, source in list(release_files.items()) + list(wheel_files.items()):
+        target_path = os.path.join(release_folder, rel_path)
+        is_py_file = rel_path in release_files and is_filename_postfix_in(rel_path, {".py"})
+        record = previous_files.get(rel_path)
+        is_record_valid = (record is not None and (same_context or not is_py_file)
+                           and _is_staged_file_unchanged(target_path, record))
+        if (is_record_valid and changed_files is not None and not isinstance(source, _GeneratedFile)
+                and record.get("path") == source and os.path.abspath(source) not in changed_files):
+            files[rel_path] = record
+            continue
+        source_content = read_release_file(source)
+        source_md5 = hashlib.md5(source_content).hexdigest()
+        if is_record_valid and record["source"] == source_md5:
+            files[rel_path] = record
+            continue
+
+        if not os.path.exists(os.path.dirname(target_path)):
+            os.makedirs(os.path.dirname(target_path))
+        # read, rewrite imports and write each python file only once
+        content = render_release_file(source, source_content, is_py_file, target_path, release_folder, is_extension,
+                                      module_index, all_py_modules)
+        with open(target_path, "wb") as f:
+            f.write(content)
+        if not isinstance(source, _GeneratedFile):
+            shutil.copymode(source, target_path)
+        files[rel_path] = {"source": source_md5, "output": hashlib.md5(content).hexdigest()}
+        if not isinstance(source, _GeneratedFile):
+            files[rel_path]["path"] = source
+
+    for rel_path, record in files.items():
+        if "size" not in record:
+            stat = os.stat(os.path.join(release_folder, rel_path))
+            record["size"] = stat.st_size
+            record["mtime"] = stat.st_mtime_ns
+    return {"context": context, "files": files}
+
+
+def zip_release_files(release_files: dict, wheel_files: dict, output_zip_file: str, release_folder: str,
+                      is_extension: bool, compress_level=DEFAULT_COMPRESS_LEVEL):
+    """
+    Write the release straight into output_zip_file.zip without staging it in release_folder first. Every source file
+    is read once, its imports are rewritten in memory and the result is written as a zip entry. The archive has the
+    same layout as zip_folder would produce from the staged release folder.
+    直接将发布文件写入压缩包，不生成发布目录
+    """
+    module_index, all_py_modules = get_release_module_index(release_files)
+    all_release_files = {**release_files, **wheel_files}
+    files = {}
+    for rel_path, source in all_release_files.items():
+        source_content = read_release_file(source)
+        is_py_file = rel_path in release_files and is_filename_postfix_in(rel_path, {".py"})
+        files[rel_path] = render_release_file(source, source_content, is_py_file,
+                                              os.path.join(release_folder, rel_path), release_folder, is_extension,
+                                              module_index, all_py_modules)
+    write_release_archive(output_zip_file, files, os.path.basename(release_folder), is_extension, compress_level)
+
+
+def write_release_archive(output_zip_file: str, files: dict, addon_name: str, is_extension: bool,
+                          compress_level=DEFAULT_COMPRESS_LEVEL):
+    # files maps the relative path in the release folder to the content
+    # the legacy addon is zipped with its folder, the extension is zipped without it
+    arc_root = "" if is_extension else addon_name + "/"
+    folders = get_module_index(files.keys()) - set(files.keys())
+    archive_folders = [arc_root + folder.replace(os.sep, "/") for folder in folders]
+    if arc_root:
+        archive_folders.append(arc_root)
+    archive_files = {arc_root + rel_path.replace(os.sep, "/"): content for rel_path, content in files.items()}
+    write_zip_archive(output_zip_file + ".zip", archive_files, archive_folders, compress_level)
+
+
+def get_release_module_index(release_files: dict):
+    # the index of the released tree and its modules are built once and shared by all files
+    module_index = get_module_index(release_files.keys())
+    all_py_modules = get_py_modules([path for path in release_files if is_filename_postfix_in(path, {".py"})])
+    return module_index, all_py_modules
+
+
+def read_release_file(source) -> bytes:
+    if isinstance(source, _GeneratedFile):
+        return source.encode("utf-8")
+    with open(source, "rb") as f:
+        return f.read()
+
+
+def render_release_file(source, source_content: bytes, is_py_file: bool, file_path: str, release_folder: str,
+                        is_extension: bool, module_index: set, all_py_modules: set) -> bytes:
+    # return the released content of a file, python files have their imports rewritten
+    if not is_py_file:
+        return source_content
+    content = decode_python_source(source_content)
+    new_content = rewrite_release_imports(content, file_path, release_folder, is_extension, module_index,
+                                          all_py_modules)
+    if new_content == content and not isinstance(source, _GeneratedFile):
+        return source_content
+    # same as writing the file with write_utf8
+    return new_content.replace("\n", os.linesep).encode("utf-8")
+
+
+def rewrite_release_imports(content: str, file_path: str, release_folder: str, is_extension: bool,
+                            module_index: set, all_py_modules: set) -> str:
+    # 必须先将绝对导入转换为相对导入，否则enhance_import一步会改变绝对导入的路径导致出错
     # convert absolute import to relative import if it's an extension
     if is_extension:
-        for py_file in search_files(release_folder, {".py"}):
-            convert_absolute_to_relative(py_file, release_folder)
-
+        lines, changed = convert_absolute_to_relative_in_lines(io.StringIO(content).readlines(), file_path,
+                                                               release_folder, module_index)
+        if changed:
+            content = "".join(lines)
     # 更新打包后的绝对导入路径：由于打包后文件夹的层级关系发生了变化，需要更新打包后的绝对导入路径
-    enhance_import_for_py_files(release_folder)
+    return enhance_import(content, os.path.basename(release_folder), all_py_modules)
 
-    # enhance relative import for root __init__.py
-    # enhance_relative_import_for_init_py(os.path.join(release_folder, "__init__.py"),
-    #                                     _ADDONS_FOLDER, addon_name)
 
-    # include wheel files when need to be zipped
-    addon_config_file = os.path.join(_ADDON_ROOT, addon_name, _ADDON_MANIFEST_FILE)
-    addon_config = {}
-    if os.path.exists(addon_config_file) and is_extension:
-        addon_config = read_ext_config(addon_config_file)
-    if need_zip:
-        # package whl files into extension
-        if "wheels" in addon_config:
-            wheel_files = addon_config["wheels"]
-            if len(wheel_files) > 0:
-                wheel_folder = os.path.join(release_folder, _WHEELS_PATH)
-                os.mkdir(wheel_folder)
-                for wheel_file in wheel_files:
-                    # You much put the .whl file directly under the wheels folder, not in a subfolder
-                    # 你必须将.whl文件直接放在wheels文件夹下，而不是在子文件夹中
-                    assert wheel_file.startswith("./wheels/") and wheel_file.count("/") == 2
-                    wheel_source = os.path.join(PROJECT_ROOT, wheel_file)
-                    if not os.path.exists(wheel_source):
-                        raise ValueError("Wheel file not found:", wheel_source,
-                                         ". Please download the required wheel file to the wheels folder.")
-                    shutil.copy(wheel_source, wheel_folder)
+def decode_python_source(content: bytes) -> str:
+    # same as reading the file with read_utf8, which translates all line endings to "\n"
+    return content.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
 
-    real_addon_name = "{addon_name}".format(addon_name=release_folder)
-    if is_extension:
-        real_addon_name = f"{real_addon_name}_ext"
-    if with_version:
-        _version: str
-        if not is_extension:
-            bl_info = get_addon_info(target_init_file)
-            if bl_info is not None:
-                _version = '.'.join([str(x) for x in bl_info['version']])
-            else:
-                raise ValueError("bl_info not found in:", target_init_file)
-        else:
-            if "version" in addon_config:
-                _version = addon_config["version"]
-            else:
-                raise ValueError("version not found in:", addon_config_file)
-        real_addon_name = f"{real_addon_name}_V{_version}"
-    if with_timestamp:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        real_addon_name = f"{real_addon_name}_{timestamp}"
 
-    released_addon_path = os.path.abspath(os.path.join(release_dir, real_addon_name) + ".zip")
-    # zip the addon
-    if need_zip:
-        zip_folder(release_folder, real_addon_name, is_extension)
-        print("Add on released:", released_addon_path)
+def get_module_index(rel_paths) -> set:
+    # all relative file paths and their parent folders, used in place of os.path.exists on the released tree
+    module_index = set()
+    for rel_path in rel_paths:
+        while rel_path and rel_path not in module_index:
+            module_index.add(rel_path)
+            rel_path = os.path.dirname(rel_path)
+    return module_index
 
-    return released_addon_path
+
+def _is_staged_file_unchanged(target_path: str, record: dict) -> bool:
+    try:
+        stat = os.stat(target_path)
+    except OSError:
+        return False
+    return stat.st_size == record.get("size") and stat.st_mtime_ns == record.get("mtime")
+
+
+def get_import_graph_cache_path(release_dir: str) -> str:
+    return os.path.join(release_dir, _RELEASE_CACHE_FOLDER, _IMPORT_GRAPH_CACHE_FILE)
+
+
+def get_released_source_files(release_dir: str, addon_name: str) -> set:
+    # the source files of the files in the last release of the addon, generated files excluded
+    manifest = load_release_manifest(get_release_manifest_path(release_dir, addon_name))
+    return {os.path.abspath(record["path"]) for record in manifest.get("files", {}).values() if "path" in record}
+
+
+def get_release_manifest_path(release_dir: str, addon_name: str) -> str:
+    return os.path.join(release_dir, _RELEASE_CACHE_FOLDER, addon_name + ".manifest.json")
+
+
+def load_release_manifest(manifest_file: str) -> dict:
+    if not os.path.isfile(manifest_file):
+        return {}
+    try:
+        manifest = json.loads(read_utf8(manifest_file))
+    except ValueError:
+        # a broken manifest only costs a full release
+        return {}
+    if manifest.get("version") != _RELEASE_MANIFEST_VERSION:
+        return {}
+    return manifest
+
+
+def save_release_manifest(manifest_file: str, manifest: dict):
+    Path(os.path.dirname(manifest_file)).mkdir(parents=True, exist_ok=True)
+    write_utf8(manifest_file, json.dumps({"version": _RELEASE_MANIFEST_VERSION, **manifest}))
+
+
+def release_addons(addon_names: list, release_dir=None, max_workers=None, dependency_workers=1,
+                   **kwargs) -> dict:
+    """
+    Release several addons concurrently with a pool of max_workers threads.
+    The dependencies of all addons are resolved first in one pass with a shared import graph cache, so the modules they
+    share (like common/) are parsed only once. kwargs are passed to release_addon.
+    Returns a dict mapping each addon name to (released path or the exception, seconds spent), and prints a summary.
+    同时发布多个插件，所有插件共享依赖缓存，共同依赖的模块只会被解析一次
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    if len(addon_names) == 0:
+        raise ValueError("No addon to release")
+    start_time = time.perf_counter()
+    if release_dir is None:
+        release_dir = settings.default_release_dir
+    import_graph_cache = ImportGraphCache(get_import_graph_cache_path(release_dir))
+    root_files = []
+    # addons which can not be released (e.g. no such addon) are reported in the summary with the other failures
+    invalid_addons = {}
+    for addon_name in addon_names:
+        try:
+            get_init_file_path(addon_name)
+        except Exception as e:
+            print(f"Release failed for {addon_name}:", e)
+            invalid_addons[addon_name] = (e, 0.0)
+            continue
+        root_files.extend(search_files(os.path.join(_ADDON_ROOT, addon_name), {".py"}, DEFAULT_EXCLUDED_FOLDERS))
+    root_files.append(os.path.join(_ADDON_ROOT, "__init__.py"))
+    find_all_dependencies(root_files, PROJECT_ROOT, import_graph_cache, dependency_workers)
+    import_graph_cache.save()
+    print(import_graph_cache.report())
+
+    def release(addon_name):
+        addon_start_time = time.perf_counter()
+        try:
+            result = release_addon(get_init_file_path(addon_name), addon_name, release_dir=release_dir,
+                                   import_graph_cache=import_graph_cache, **kwargs)
+        except Exception as e:
+            print(f"Release failed for {addon_name}:", e)
+            result = e
+        return result, time.perf_counter() - addon_start_time
+
+    valid_addons = [addon_name for addon_name in addon_names if addon_name not in invalid_addons]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        released = dict(zip(valid_addons, executor.map(release, valid_addons)))
+    results = {addon_name: invalid_addons.get(addon_name) or released[addon_name] for addon_name in addon_names}
+
+    print("Release summary:")
+    name_width = max(len(addon_name) for addon_name in addon_names)
+    for addon_name, (result, seconds) in results.items():
+        status = f"failed: {result}" if isinstance(result, Exception) else result
+        print(f"  {addon_name:<{name_width}}  {seconds:7.2f}s  {status}")
+    print(f"  {'total':<{name_width}}  {time.perf_counter() - start_time:7.2f}s")
+    return results
+
+
+def get_all_addon_names() -> list:
+    # every package under the addons folder is an addon
+    return sorted(name for name in os.listdir(_ADDON_ROOT)
+                  if os.path.isfile(os.path.join(_ADDON_ROOT, name, "__init__.py")))
 
 
 def get_addon_info(filename: str):
+    import ast
     file_content = read_utf8(filename)
     try:
         parsed_ast = ast.parse(file_content)
@@ -363,8 +1327,7 @@ def unregister():
 
 # pyc files are auto generated, need to be removed before release
 def remove_pyc_files(release_folder: str):
-    all_pyc_file = search_files(release_folder, {"pyc"})
-    for pyc_file in all_pyc_file:
+    for pyc_file in iter_files(release_folder, {"pyc"}):
         os.remove(pyc_file)
 
 
@@ -381,14 +1344,16 @@ def remove_empty_folders(root_path):
 
 
 # Zip the folder in a way that blender can recognize it as an addon.
-def zip_folder(target_root, output_zip_file, is_extension):
-    if is_extension:
-        shutil.make_archive(output_zip_file, 'zip', Path(target_root))
-    else:
-        shutil.make_archive(output_zip_file, 'zip', Path(target_root).parent, base_dir=os.path.basename(target_root))
+def zip_folder(target_root, output_zip_file, is_extension, compress_level=DEFAULT_COMPRESS_LEVEL):
+    files = {}
+    for file in search_files(target_root, set()):
+        with open(file, "rb") as f:
+            files[os.path.relpath(file, target_root)] = f.read()
+    write_release_archive(output_zip_file, files, os.path.basename(target_root), is_extension, compress_level)
 
 
 def find_imported_modules(file_path):
+    import ast
     root = ast.parse(read_utf8(file_path), filename=file_path)
 
     imported_modules = set()
@@ -409,68 +1374,131 @@ def find_imported_modules(file_path):
 
 
 def resolve_module_path(module_name, base_path, project_root):
-    if not module_name.endswith(".*"):
-        # Handle import all
-        module_path = module_name.replace('.', '/')
-        module_path = os.path.join(project_root, module_path)
-        if os.path.isdir(module_path):
-            module_path = os.path.join(module_path, '__init__.py')
-            return [module_path]
-        elif os.path.isfile(module_path + '.py'):
-            module_path = module_path + '.py'
-            return [module_path]
-        else:
-            if "." not in module_name:
-                # most likely a standard library module
-                # 有一种可能是相对导入 from . import xxx, from .. import xxx 等
-                # 这种情况下需要根据当前文件的路径来解析 看module_name.py是否存在于当前文件的同级目录或者父级目录
-                # 从base_path开始向上查找，直到找到module_name.py或者到达project_root
-                search_path = os.path.dirname(base_path)
-                potential_result = []
-                while is_subdirectory(search_path, project_root):
-                    possible_path = os.path.join(search_path, module_name + '.py')
-                    if os.path.isfile(possible_path):
-                        potential_result.append(possible_path)
-                    search_path = os.path.dirname(search_path)
-                return potential_result
-            current_search_dir = os.path.dirname(base_path)
-            while is_subdirectory(current_search_dir, project_root):
-                module_path = module_name.replace('.', '/')
-                module_path = os.path.join(current_search_dir, module_path)
-                if os.path.isdir(module_path):
-                    module_path = os.path.join(module_path, '__init__.py')
-                    return [module_path]
-                elif os.path.isfile(module_path + '.py'):
-                    module_path = module_path + '.py'
-                    return [module_path]
-                current_search_dir = os.path.dirname(current_search_dir)
-            return []
-    else:
-        module_name = module_name[:-2]
+    # the paths of the project files module_name imported in base_path might refer to, see ProjectModuleIndex.resolve
+    return get_project_module_index(project_root).resolve(module_name, os.path.abspath(base_path))
+
+
+class ProjectModuleIndex:
+    """
+    Index of the folders and .py files under project_root built from a single scan, so imports are resolved by
+    dictionary lookups instead of file system calls. Hidden folders, DEFAULT_EXCLUDED_FOLDERS and virtual environments
+    (folders with a pyvenv.cfg, e.g. a project local venv) are not indexed, the addons never import from them. The
+    scan also gives the module layout signature used by ImportGraphCache.
+    An imported name whose top level name is neither a folder nor a .py file in the project (every standard library,
+    bpy, mathutils... import unless the project shadows it) is rejected at once, other results are memoised per module
+    name and importing folder.
+    扫描一次项目目录建立模块索引，解析导入时只需查表
+    """
+
+    def __init__(self, project_root: str):
+        self.project_root = os.path.abspath(project_root)
+        self._folders = set()
+        self._py_files = set()
+        # names of every folder and .py file, the first part of a module name must be one of them
+        self._names = set()
+        self._resolved = {}
+        self._search_folders = {}
+        md5 = hashlib.md5()
+        for root, dirnames, filenames in os.walk(self.project_root):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith(".") and d not in DEFAULT_EXCLUDED_FOLDERS
+                                 and not os.path.isfile(os.path.join(root, d, "pyvenv.cfg")))
+            md5.update(os.path.relpath(root, self.project_root).encode("utf-8"))
+            self._folders.add(os.path.normcase(root))
+            self._names.update(dirnames)
+            for filename in sorted(filenames):
+                if filename.endswith(".py"):
+                    md5.update(b"/" + filename.encode("utf-8"))
+                    self._py_files.add(os.path.normcase(os.path.join(root, filename)))
+                    self._names.add(filename[:-3])
+            md5.update(b"\n")
+        # Imports are resolved against folders and .py files only, so adding or removing any of them changes the
+        # signature while editing a file does not.
+        self.signature = md5.hexdigest()
+
+    def resolve(self, module_name: str, base_path: str) -> list:
+        """
+        Return the paths module_name imported in the file base_path might refer to.
+        module_name is looked up under project_root first, then in the folder of base_path and each of its parent
+        folders within project_root, which covers relative imports. A package resolves to its __init__.py. A plain
+        name (no dots) found nowhere else resolves to every module_name.py in those folders. A trailing ".*" (import
+        all) is ignored.
+        """
+        key = (module_name, os.path.dirname(base_path))
+        resolved = self._resolved.get(key)
+        if resolved is None:
+            resolved = self._resolve(module_name, key[1])
+            self._resolved[key] = resolved
+        return list(resolved)
+
+    def _resolve(self, module_name: str, base_folder: str) -> tuple:
+        import_all = module_name.endswith(".*")
+        if import_all:
+            module_name = module_name[:-2]
+        if module_name.split(".")[0] not in self._names:
+            return ()
         module_path = module_name.replace('.', '/')
-        possible_root_path = os.path.join(project_root, module_path)
-        if os.path.isdir(possible_root_path):
-            possible_root_path = os.path.join(possible_root_path, '__init__.py')
-            return [possible_root_path]
-        elif os.path.isfile(possible_root_path + '.py'):
-            possible_root_path = possible_root_path + '.py'
-            return [possible_root_path]
-        else:
-            current_search_dir = os.path.dirname(base_path)
-            while is_subdirectory(current_search_dir, project_root):
+        found = self._find_module(self.project_root, module_path)
+        if found is not None:
+            return found,
+        if not import_all and "." not in module_name:
+            # 有一种可能是相对导入 from . import xxx, from .. import xxx 等
+            # 这种情况下需要根据当前文件的路径来解析 看module_name.py是否存在于当前文件的同级目录或者父级目录
+            # 从base_path开始向上查找，直到找到module_name.py或者到达project_root
+            return tuple(os.path.join(folder, module_name + '.py') for folder in self._get_search_folders(base_folder)
+                         if self._is_py_file(os.path.join(folder, module_name + '.py')))
+        for folder in self._get_search_folders(base_folder):
+            found = self._find_module(folder, module_path)
+            if found is not None:
+                return found,
+        return ()
+
+    # the package or module at module_path in folder, None if there is neither
+    def _find_module(self, folder: str, module_path: str):
+        path = os.path.join(folder, module_path)
+        if os.path.normcase(os.path.normpath(path)) in self._folders:
+            return os.path.join(path, '__init__.py')
+        if self._is_py_file(path + '.py'):
+            return path + '.py'
+        return None
+
+    def _is_py_file(self, path: str) -> bool:
+        return os.path.normcase(os.path.normpath(path)) in self._py_files
+
+    # base_folder and its parent folders within project_root
+    def _get_search_folders(self, base_folder: str) -> list:
+        search_folders = self._search_folders.get(base_folder)
+        if search_folders is None:
+            search_folders = []
+            folder = base_folder
+            while is_subdirectory(folder, self.project_root):
+                search_folders.append(folder)
+                if os.path.dirname(folder) == folder:
+                    break
+                folder = os.path.dirname(folder)
+            self._search_folders[base_folder] = search_folders
+        return search_folders
+
 
-                possible_root_path = os.path.join(current_search_dir, module_path)
-                if os.path.isdir(possible_root_path):
-                    possible_root_path = os.path.join(possible_root_path, '__init__.py')
-                    return [possible_root_path]
-                elif os.path.isfile(possible_root_path + '.py'):
-                    possible_root_path = possible_root_path + '.py'
-                    return [possible_root_path]
-                current_search_dir = os.path.dirname(current_search_dir)
-            return []
+# one index per project root, rebuilt by every ImportGraphCache when it checks the module layout
+_project_module_indexes = {}
 
 
-def find_all_dependencies(file_paths: list, project_root: str):
+def get_project_module_index(project_root: str, refresh=False) -> ProjectModuleIndex:
+    project_root = os.path.abspath(project_root)
+    index = _project_module_indexes.get(project_root)
+    if index is None or refresh:
+        index = ProjectModuleIndex(project_root)
+        _project_module_indexes[project_root] = index
+    return index
+
+
+def find_all_dependencies(file_paths: list, project_root: str, cache=None, max_workers=1):
+    # cache is an optional ImportGraphCache, files which are not changed since they were cached are not parsed again
+    # if max_workers is larger than 1, files are parsed in parallel by a process pool
+    if cache is None:
+        cache = ImportGraphCache()
+    if max_workers is None or max_workers > 1:
+        return find_all_dependencies_in_parallel(file_paths, project_root, cache, max_workers)
     dependencies = set()
     to_process = file_paths.copy()
     processed = set()
@@ -484,7 +1512,7 @@ def find_all_dependencies(file_paths: list, project_root: str):
         dependencies.add(current_file)
 
         try:
-            imported_modules = find_imported_modules(current_file)
+            resolved_paths = cache.get_dependencies(current_file, project_root)
         except SyntaxError as e:
             raise SyntaxError(f"Syntax error in file {current_file}: {e}")
 
@@ -509,32 +1537,249 @@ def find_all_dependencies(file_paths: list, project_root: str):
         #     potential_init_file = os.path.abspath(
         #         os.path.join(os.path.dirname(os.path.dirname(potential_init_file)), '__init__.py'))
 
-        for module in imported_modules:
-            module_path = resolve_module_path(module, current_file, project_root)
-            if len(module_path) > 0:
-                for each_module_path in module_path:
-                    each_module_path = os.path.abspath(each_module_path)
-                    if each_module_path not in processed:
-                        to_process.append(each_module_path)
+        for each_module_path in resolved_paths:
+            if each_module_path not in processed:
+                to_process.append(each_module_path)
 
     return dependencies
 
 
+# Parse file_path unless its imported modules are given, and resolve them to file paths.
+# This is a module level function so that it can be run in a worker process.
+def find_all_dependencies_in_parallel(file_paths: list, project_root: str, cache, max_workers=None):
+    """
+    Same as find_all_dependencies, but expands the dependency graph layer by layer (breadth first) and parses the
+    files of each layer which are not cached in a process pool with max_workers processes. The result is the same as
+    the serial version.
+    按层并行解析依赖，结果与串行版本一致
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    processed = set()
+    to_process = sorted(set(os.path.abspath(file_path) for file_path in file_paths))
+    executor = None
+    try:
+        while to_process:
+            processed.update(to_process)
+            next_layer = set()
+            to_expand = []
+            for current_file in to_process:
+                resolved_paths = cache.get_cached_dependencies(current_file, project_root)
+                if resolved_paths is None:
+                    to_expand.append(current_file)
+                else:
+                    next_layer.update(resolved_paths)
+
+            futures = {}
+            if len(to_expand) > 1:
+                if executor is None:
+                    executor = ProcessPoolExecutor(max_workers=max_workers)
+                for current_file in to_expand:
+                    futures[current_file] = executor.submit(expand_file_dependencies, current_file, project_root,
+                                                            cache.get_cached_modules(current_file))
+            for current_file in to_expand:
+                try:
+                    if current_file in futures:
+                        imported_modules, resolved_paths = futures[current_file].result()
+                    else:
+                        imported_modules, resolved_paths = expand_file_dependencies(
+                            current_file, project_root, cache.get_cached_modules(current_file))
+                except SyntaxError as e:
+                    raise SyntaxError(f"Syntax error in file {current_file}: {e}")
+                cache.update(current_file, project_root, imported_modules, resolved_paths)
+                next_layer.update(resolved_paths)
+
+            to_process = sorted(next_layer - processed)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    return processed
+
+
+def expand_file_dependencies(file_path: str, project_root: str, imported_modules=None):
+    if imported_modules is None:
+        imported_modules = find_imported_modules(file_path)
+    return sorted(imported_modules), resolve_imported_modules(imported_modules, file_path, project_root)
+
+
+def resolve_imported_modules(imported_modules, file_path: str, project_root: str) -> list:
+    resolved_paths = []
+    for module in sorted(imported_modules):
+        module_path = resolve_module_path(module, file_path, project_root)
+        for each_module_path in module_path:
+            resolved_paths.append(os.path.abspath(each_module_path))
+    return resolved_paths
+
+
+class ImportGraphCache:
+    """
+    Cache of the import graph used by find_all_dependencies.
+    For every parsed file it keeps the imported module names and the file paths they resolve to, keyed by the file
+    path, size and modification time. The resolved paths are only reused while the python module layout (folders and
+    .py files) under the project root is unchanged, the imported module names are reused until the file changes.
+    If cache_file is given, the cache is loaded from and saved to that json file.
+    缓存每个文件导入的模块及其解析路径，未修改的文件不会被重新解析
+    """
+
+    def __init__(self, cache_file: str = None):
+        self.cache_file = cache_file
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._checked_entries = {}
+        self._layouts = {}
+        if cache_file is not None and os.path.isfile(cache_file):
+            try:
+                content = json.loads(read_utf8(cache_file))
+            except ValueError:
+                content = {}
+            if content.get("version") == _IMPORT_GRAPH_CACHE_VERSION:
+                self._entries = content.get("files", {})
+
+    def get_dependencies(self, file_path: str, project_root: str) -> list:
+        file_path = os.path.abspath(file_path)
+        resolved_paths = self.get_cached_dependencies(file_path, project_root)
+        if resolved_paths is None:
+            imported_modules, resolved_paths = expand_file_dependencies(file_path, project_root,
+                                                                        self.get_cached_modules(file_path))
+            self.update(file_path, project_root, imported_modules, resolved_paths)
+        return resolved_paths
+
+    # return the resolved paths of file_path if both its content and the module layout are unchanged, otherwise None
+    def get_cached_dependencies(self, file_path: str, project_root: str):
+        entry = self._get_entry(file_path)
+        if "modules" in entry and entry.get("layout") == self._get_layout(project_root):
+            return entry["resolved"]
+        return None
+
+    # return the imported modules of file_path if its content is unchanged, otherwise None
+    def get_cached_modules(self, file_path: str):
+        return self._get_entry(file_path).get("modules")
+
+    def update(self, file_path: str, project_root: str, imported_modules: list, resolved_paths: list):
+        entry = self._get_entry(file_path)
+        entry["modules"] = imported_modules
+        entry["resolved"] = resolved_paths
+        entry["layout"] = self._get_layout(project_root)
+
+    def _get_entry(self, file_path: str) -> dict:
+        # every file is checked against the file system only once
+        if file_path in self._checked_entries:
+            return self._checked_entries[file_path]
+        stat = os.stat(file_path)
+        entry = self._entries.get(file_path)
+        if entry is not None and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime_ns:
+            self.hits += 1
+        else:
+            self.misses += 1
+            entry = {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+            self._entries[file_path] = entry
+        self._checked_entries[file_path] = entry
+        return entry
+
+    def _get_layout(self, project_root: str) -> str:
+        project_root = os.path.abspath(project_root)
+        if project_root not in self._layouts:
+            # the module index is rebuilt with the layout, so resolving follows the current project files
+            self._layouts[project_root] = get_project_module_index(project_root, refresh=True).signature
+        return self._layouts[project_root]
+
+    def save(self):
+        if self.cache_file is None:
+            return
+        Path(os.path.dirname(self.cache_file)).mkdir(parents=True, exist_ok=True)
+        content = json.dumps({"version": _IMPORT_GRAPH_CACHE_VERSION, "files": self._entries})
+        # write to a temporary file first so that a concurrent reader never sees a partial cache
+        temp_file = f"{self.cache_file}.{os.getpid()}.tmp"
+        write_utf8(temp_file, content)
+        os.replace(temp_file, self.cache_file)
+
+    def report(self) -> str:
+        return f"Import graph cache: {self.hits} hits, {self.misses} misses"
+
+
 def enhance_import_for_py_files(addon_dir: str):
     namespace = os.path.basename(addon_dir)
     all_py_modules = find_all_py_modules(addon_dir)
-    all_py_file = search_files(addon_dir, {".py"})
-    for py_file in all_py_file:
-        hasUpdated = False
-        content = read_utf8(py_file)
-        for module_path in _import_module_pattern.finditer(content):
-            original_module_path = module_path.groups()[0]
-            if original_module_path in all_py_modules:
-                hasUpdated = True
-                content = content.replace("from " + original_module_path + " import",
-                                          "from " + namespace + "." + original_module_path + " import")
-        if hasUpdated:
-            write_utf8(py_file, content)
+    for py_file in iter_files(addon_dir, {".py"}, DEFAULT_EXCLUDED_FOLDERS):
+        enhance_import_for_py_file(py_file, namespace, all_py_modules)
+
+
+def enhance_import_for_py_file(py_file: str, namespace: str, all_py_modules: set):
+    content = read_utf8(py_file)
+    new_content = enhance_import(content, namespace, all_py_modules)
+    if new_content != content:
+        write_utf8(py_file, new_content)
+
+
+def enhance_import(content: str, namespace: str, all_py_modules: set) -> str:
+    """
+    Prefix namespace to the module of every "from xxx import yyy" statement whose module is in all_py_modules.
+    The source is tokenized once, so imports split over several lines are handled, while strings and comments are
+    left untouched. Content which can not be tokenized falls back to the pattern based rewriting.
+    在所有导入项目内模块的 from xxx import yyy 语句的模块名前加上命名空间
+    """
+    import tokenize
+    try:
+        insert_positions = find_import_positions_to_enhance(content, all_py_modules)
+    except (tokenize.TokenError, SyntaxError):
+        return enhance_import_by_pattern(content, namespace, all_py_modules)
+    if len(insert_positions) == 0:
+        return content
+    # token positions are (row, column), convert them to offsets in the content
+    line_offsets = [0]
+    for line in io.StringIO(content):
+        line_offsets.append(line_offsets[-1] + len(line))
+    pieces = []
+    last_offset = 0
+    for row, column in insert_positions:
+        offset = line_offsets[row - 1] + column
+        pieces.append(content[last_offset:offset])
+        pieces.append(namespace + ".")
+        last_offset = offset
+    pieces.append(content[last_offset:])
+    return "".join(pieces)
+
+
+def find_import_positions_to_enhance(content: str, all_py_modules: set) -> list:
+    # return the start positions of the module names of the absolute "from xxx import yyy" statements to be enhanced
+    import tokenize
+    positions = []
+    # 0: not in an import, 1: after "from", 2: after a part of the module name, 3: after a "." in the module name
+    state = 0
+    module_start = None
+    module_names = []
+    for token in tokenize.generate_tokens(io.StringIO(content).readline):
+        if token.type in (tokenize.NL, tokenize.COMMENT):
+            continue
+        if token.type == tokenize.NAME and token.string == "from":
+            state = 1
+        elif state == 1 and token.type == tokenize.NAME:
+            # relative imports start with "." and are never enhanced
+            module_start = token.start
+            module_names = [token.string]
+            state = 2
+        elif state == 2 and token.type == tokenize.NAME and token.string == "import":
+            if ".".join(module_names) in all_py_modules:
+                positions.append(module_start)
+            state = 0
+        elif state == 2 and token.type == tokenize.OP and token.string == ".":
+            state = 3
+        elif state == 3 and token.type == tokenize.NAME:
+            module_names.append(token.string)
+            state = 2
+        else:
+            # "yield from xxx", "raise xxx from yyy" or a relative import
+            state = 0
+    return positions
+
+
+def enhance_import_by_pattern(content: str, namespace: str, all_py_modules: set) -> str:
+    for module_path in _import_module_pattern.finditer(content):
+        original_module_path = module_path.groups()[0]
+        if original_module_path in all_py_modules:
+            content = content.replace("from " + original_module_path + " import",
+                                      "from " + namespace + "." + original_module_path + " import")
+    return content
 
 
 def convert_absolute_to_relative(file_path: str, project_root: str):
@@ -553,7 +1798,20 @@ def convert_absolute_to_relative(file_path: str, project_root: str):
     project_root = os.path.abspath(project_root)
 
     lines = read_utf8_in_lines(file_path)
+    modified_lines, changed = convert_absolute_to_relative_in_lines(lines, file_path, project_root)
+
+    # Write the modified content back to the file if changes were made
+    if changed:
+        write_utf8_in_lines(file_path, modified_lines)
+
 
+def convert_absolute_to_relative_in_lines(lines: list[str], file_path: str, project_root: str, module_index=None):
+    """
+    Convert all absolute imports in lines of the file at file_path to relative imports.
+    If module_index (see get_module_index) is given, it is used to check whether a module is within the project
+    instead of checking the file system.
+    Returns the converted lines and whether any line is changed.
+    """
     modified_lines = []
     changed = False
 
@@ -573,7 +1831,12 @@ def convert_absolute_to_relative(file_path: str, project_root: str):
             # Check if the absolute module is within the project
             absolute_module_path = absolute_module.replace('.', os.sep)
             full_module_path = os.path.join(project_root, absolute_module_path)
-            if os.path.exists(full_module_path) or os.path.exists(f"{full_module_path}.py"):
+            if module_index is not None:
+                is_project_module = (absolute_module_path in module_index
+                                     or f"{absolute_module_path}.py" in module_index)
+            else:
+                is_project_module = os.path.exists(full_module_path) or os.path.exists(f"{full_module_path}.py")
+            if is_project_module:
                 # Calculate the relative import path
 
                 target_relative_path = os.path.relpath(
@@ -599,17 +1862,18 @@ def convert_absolute_to_relative(file_path: str, project_root: str):
             modified_lines.append(line)
         # print(f"not match {line} in {timer() - start3} seconds")
 
-    # Write the modified content back to the file if changes were made
-    if changed:
-        write_utf8_in_lines(file_path, modified_lines)
+    return modified_lines, changed
 
 
 def find_all_py_modules(root_dir: str) -> set:
+    return get_py_modules([os.path.relpath(py_file, root_dir)
+                           for py_file in iter_files(root_dir, {".py"}, DEFAULT_EXCLUDED_FOLDERS)])
+
+
+def get_py_modules(rel_py_paths) -> set:
     all_py_modules = set()
-    all_py_file = search_files(root_dir, {".py"})
-    for py_file in all_py_file:
-        rel_path = str(os.path.relpath(py_file, root_dir))
-        modules = rel_path.replace("__init__.py", "").replace(".py", "").split(os.path.sep)
+    for rel_path in rel_py_paths:
+        modules = str(rel_path).replace("__init__.py", "").replace(".py", "").split(os.path.sep)
         if len(modules[-1]) == 0:
             modules = modules[0:-1]
 
@@ -620,64 +1884,283 @@ def find_all_py_modules(root_dir: str) -> set:
     return all_py_modules
 
 
-def start_watch_for_update(init_file, addon_name, stop_event: threading.Event):
-    install_if_missing("watchdog")
+class FileChangeCollector:
+    """
+    Collect the paths reported by the file watcher. The watching thread sleeps on a condition variable until a change
+    arrives, then keeps collecting until no new change arrives for debounce_seconds, so a burst of saves triggers only
+    one update.
+    收集文件变化，在debounce_seconds内没有新的变化时才触发一次更新
+    """
+
+    def __init__(self, debounce_seconds=_WATCH_DEBOUNCE_SECONDS):
+        self.debounce_seconds = debounce_seconds
+        self._condition = threading.Condition()
+        self._changed_paths = set()
+        self._last_change_time = 0
+        self._stopped = False
+
+    def add(self, path: str):
+        with self._condition:
+            self._changed_paths.add(os.path.abspath(path))
+            self._last_change_time = time.monotonic()
+            self._condition.notify_all()
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+
+    # block until changes are collected and return the changed paths, or return None once stopped
+    def wait_for_changes(self):
+        with self._condition:
+            while not self._stopped:
+                if len(self._changed_paths) == 0:
+                    self._condition.wait()
+                    continue
+                remaining_time = self._last_change_time + self.debounce_seconds - time.monotonic()
+                if remaining_time > 0:
+                    self._condition.wait(remaining_time)
+                    continue
+                changed_paths = self._changed_paths
+                self._changed_paths = set()
+                return changed_paths
+            return None
+
+
+def start_watch_for_update(init_file, addon_name, change_collector: FileChangeCollector, reload_channel=None):
+    """
+    Watch the addon folder and every file the addon depends on (the files released with it), and update the test addon
+    with the changed files when changes are collected. The watched files are refreshed after every update since the
+    dependencies might have changed.
+    只监听插件目录及插件依赖的文件，而不是整个项目
+    """
+    # already installed by test_addon unless start_test is called directly
+    provision_framework_dependencies([("watchdog", "watchdog")])
     from watchdog.events import FileSystemEventHandler
     from watchdog.observers import Observer
 
-    class FileUpdateHandler(FileSystemEventHandler):
-        def __init__(self):
-            super(FileUpdateHandler, self).__init__()
-            self.has_update = False
+    addon_folder = os.path.abspath(os.path.join(_ADDON_ROOT, addon_name))
+    watched_files = set()
+    watched_folders = {}
 
-        def on_any_event(self, event):
-            source_path = event.src_path
-            if source_path.endswith(".py"):
-                self.has_update = True
+    def is_watched_path(path: str):
+        if path in watched_files:
+            return True
+        if not is_subdirectory(path, addon_folder):
+            return False
+        # ignore python caches and temporary files created by editors
+        filename = os.path.basename(path)
+        return ("__pycache__" not in Path(path).parts and not filename.startswith(".")
+                and not filename.endswith(("~", ".pyc", ".tmp", ".swp")))
 
-        def clear_update(self):
-            self.has_update = False
+    class FileUpdateHandler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            # opening or reading files (the release itself does) is not a change, neither is a folder being modified
+            if event.event_type not in _WATCHED_EVENT_TYPES or (event.is_directory and event.event_type == "modified"):
+                return
+            # a file saved by replacing it is reported as moved to its path
+            for path in (event.src_path, getattr(event, "dest_path", "")):
+                if path and is_watched_path(os.path.abspath(path)):
+                    change_collector.add(path)
 
-    path = PROJECT_ROOT
     event_handler = FileUpdateHandler()
     observer = Observer()
-    observer.schedule(event_handler, path, recursive=True)
+
+    def watch_files(files: set):
+        watched_files.clear()
+        watched_files.update(files)
+        # the addon folder is watched recursively, other dependencies by their folders
+        folders = {os.path.dirname(file) for file in files if not is_subdirectory(file, addon_folder)}
+        for folder in set(watched_folders) - folders:
+            observer.unschedule(watched_folders.pop(folder))
+        for folder in folders - set(watched_folders):
+            watched_folders[folder] = observer.schedule(event_handler, folder, recursive=False)
+
+    observer.schedule(event_handler, addon_folder, recursive=True)
+    watch_files(get_released_source_files(settings.test_release_dir, addon_name))
     observer.start()
+    # md5 of the installed files, kept for the whole session
+    md5_cache = {}
 
     try:
-        while not stop_event.is_set():
-            time.sleep(1)
-            if event_handler.has_update:
-                try:
-                    update_addon_for_test(init_file, addon_name)
-                    event_handler.clear_update()
-                except Exception as e:
-                    print(e)
-                    print(
-                        "Addon updated failed: Please make sure no other process is"
-                        " using the addon folder. You might need to restart the test to update the addon in Blender.")
+        while True:
+            changed_paths = change_collector.wait_for_changes()
+            if changed_paths is None:
+                break
+            try:
+                update_addon_for_test(init_file, addon_name, changed_paths, reload_channel, md5_cache)
+                watch_files(get_released_source_files(settings.test_release_dir, addon_name))
+            except Exception as e:
+                print(e)
+                print(
+                    "Addon updated failed: Please make sure no other process is"
+                    " using the addon folder. You might need to restart the test to update the addon in Blender.")
         print("Stop watching for update...")
-
-    except KeyboardInterrupt:
+    finally:
         observer.stop()
         observer.join()
 
 
-def update_addon_for_test(init_file, addon_name):
-    if BLENDER_ADDON_PATH is None:
+def update_addon_for_test(init_file, addon_name, changed_files=None, reload_channel=None, md5_cache=None):
+    if settings.blender_addon_path is None:
         # 无法得到Blender插件路径 请检查在main.py或config.ini中的配置
         raise ValueError(
             "Could not find Blender addon installation path. Please check the configuration in main.py or config.ini")
+    # the import graph of this update is parsed once, for the release and for the modules to reload
+    import_graph_cache = ImportGraphCache(get_import_graph_cache_path(settings.test_release_dir))
     addon_path = release_addon(init_file, addon_name, with_timestamp=False,
-                               is_extension=IS_EXTENSION,
-                               release_dir=TEST_RELEASE_DIR, need_zip=False)
+                               is_extension=settings.is_extension,
+                               release_dir=settings.test_release_dir, need_zip=False,
+                               incremental=True, import_graph_cache=import_graph_cache,
+                               changed_files=changed_files)
     executable_path = os.path.join(os.path.dirname(addon_path), addon_name)
+    manifest = load_release_manifest(get_release_manifest_path(settings.test_release_dir, addon_name))
+    file_hashes = {rel_path: record["output"] for rel_path, record in manifest["files"].items()}
 
-    test_addon_path = os.path.join(BLENDER_ADDON_PATH, addon_name)
-    if os.path.exists(test_addon_path):
-        shutil.rmtree(test_addon_path)
-    shutil.copytree(executable_path, test_addon_path)
+    # only copy the changed files, Blender might be holding the other files open
+    # 只复制发生变化的文件
+    test_addon_path = os.path.join(settings.blender_addon_path, addon_name)
+    updated_files = sync_addon_folder(executable_path, test_addon_path, file_hashes, md5_cache)
 
     # write an MD5 to the addon folder to inform the addon content has been changed
-    addon_md5 = get_md5_folder(executable_path)
+    addon_md5 = hashlib.md5("".join(f"{rel_path}:{file_hashes[rel_path]}\n"
+                                    for rel_path in sorted(file_hashes)).encode("utf-8")).hexdigest()
     write_utf8(os.path.join(test_addon_path, _addon_md5__signature), addon_md5)
+    if reload_channel is not None and len(updated_files) > 0:
+        changed_py_files = [rel_path for rel_path in updated_files if rel_path.endswith(".py")]
+        # other files (e.g. translation catalogs) are read when the addon is registered, the whole addon is reloaded
+        if len(changed_py_files) < len(updated_files):
+            modules_to_reload = None
+        else:
+            modules_to_reload = get_modules_to_reload(addon_name, manifest, changed_py_files, import_graph_cache)
+        reload_channel.push({
+            "signature": addon_md5,
+            "modules": sorted(get_module_name(addon_name, rel_path) for rel_path in changed_py_files),
+            "reload": modules_to_reload,
+        })
+    import_graph_cache.save()
+    print(import_graph_cache.report())
+
+
+def get_modules_to_reload(addon_name: str, manifest: dict, changed_py_files: list, import_graph_cache) -> list:
+    """
+    Return the names of the changed modules of the test addon and of every module importing them directly or
+    indirectly, these are the modules Blender has to reload. The import graph is the one find_all_dependencies uses.
+    A module is listed after the modules it imports, modules importing each other are listed by name.
+    根据导入关系找到发生变化的模块及所有直接或间接导入它们的模块
+    """
+    rel_paths_by_source = {os.path.abspath(record["path"]): rel_path for rel_path, record in manifest["files"].items()
+                           if "path" in record and rel_path.endswith(".py")}
+    dependents = {}
+    dependencies = {}
+    for source, rel_path in rel_paths_by_source.items():
+        dependencies[rel_path] = set()
+        for dependency in import_graph_cache.get_dependencies(source, PROJECT_ROOT):
+            dependency_rel_path = rel_paths_by_source.get(os.path.abspath(dependency))
+            if dependency_rel_path is not None and dependency_rel_path != rel_path:
+                dependents.setdefault(dependency_rel_path, set()).add(rel_path)
+                dependencies[rel_path].add(dependency_rel_path)
+
+    modules_to_reload = set()
+    to_process = list(changed_py_files)
+    while to_process:
+        rel_path = to_process.pop()
+        if rel_path in modules_to_reload:
+            continue
+        modules_to_reload.add(rel_path)
+        to_process.extend(dependents.get(rel_path, ()))
+
+    # reload order: repeatedly take the modules whose imports to reload are all taken
+    ordered_modules = []
+    while modules_to_reload:
+        ready = sorted(rel_path for rel_path in modules_to_reload
+                       if dependencies.get(rel_path, set()).isdisjoint(modules_to_reload))
+        if len(ready) == 0:
+            # circular imports
+            ready = sorted(modules_to_reload)
+        ordered_modules.extend(ready)
+        modules_to_reload.difference_update(ready)
+    return [get_module_name(addon_name, rel_path) for rel_path in ordered_modules]
+
+
+def get_module_name(package_name: str, rel_path: str) -> str:
+    # the name of the module at rel_path in the package
+    module_path = os.path.splitext(rel_path)[0].split(os.sep)
+    if module_path[-1] == "__init__":
+        module_path = module_path[:-1]
+    return ".".join([package_name] + module_path)
+
+
+def sync_addon_folder(source_folder: str, target_folder: str, file_hashes: dict, md5_cache: dict = None) -> list:
+    """
+    Make target_folder a copy of source_folder like rsync does, return the relative paths of the files copied or
+    deleted.
+    file_hashes maps the relative path of every file in source_folder to its md5. A file is copied only when the target
+    differs in size, or differs in modification time and md5. Files not in source_folder are deleted, except the addon
+    signature and the __pycache__ folders Blender creates, from which the bytecode of the copied or deleted python
+    files is removed. md5_cache is the memo of get_md5, keep it between calls so unchanged target files are not read
+    again.
+    """
+    changed_files = []
+    Path(target_folder).mkdir(parents=True, exist_ok=True)
+    for root, dirnames, filenames in os.walk(target_folder):
+        dirnames[:] = [dirname for dirname in dirnames if dirname != "__pycache__"]
+        for filename in filenames:
+            target_path = os.path.join(root, filename)
+            rel_path = os.path.relpath(target_path, target_folder)
+            if rel_path not in file_hashes and rel_path != _addon_md5__signature:
+                os.remove(target_path)
+                remove_bytecode(target_path)
+                changed_files.append(rel_path)
+    removed_path = 1
+    while removed_path > 0:
+        removed_path = remove_empty_folders(target_folder)
+
+    files_to_copy = []
+    # target files of the same size but another modification time, compared by md5
+    files_to_hash = {}
+    for rel_path in file_hashes:
+        source_stat = os.stat(os.path.join(source_folder, rel_path))
+        try:
+            target_stat = os.stat(os.path.join(target_folder, rel_path))
+        except OSError:
+            target_stat = None
+        if target_stat is None or target_stat.st_size != source_stat.st_size:
+            files_to_copy.append(rel_path)
+        elif target_stat.st_mtime_ns != source_stat.st_mtime_ns:
+            files_to_hash[os.path.join(target_folder, rel_path)] = (rel_path, source_stat)
+    target_md5 = get_md5_files(list(files_to_hash), cache=md5_cache) if files_to_hash else {}
+    for target_path, (rel_path, source_stat) in files_to_hash.items():
+        if target_md5[target_path] == file_hashes[rel_path]:
+            # same content, align the modification time so it is not hashed again
+            os.utime(target_path, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+        else:
+            files_to_copy.append(rel_path)
+
+    for rel_path in files_to_copy:
+        source_path = os.path.join(source_folder, rel_path)
+        target_path = os.path.join(target_folder, rel_path)
+        if not os.path.exists(os.path.dirname(target_path)):
+            os.makedirs(os.path.dirname(target_path))
+        shutil.copy2(source_path, target_path)
+        remove_bytecode(target_path)
+        changed_files.append(rel_path)
+    return changed_files
+
+
+def remove_bytecode(py_file: str):
+    """
+    Delete the bytecode Blender cached for py_file. A .pyc is only checked against the size and the whole second
+    modification time of its source, and copy2 keeps the modification time of the staged file, so two edits of the
+    same size within a second would otherwise be served from the stale bytecode.
+    删除py文件对应的pyc缓存 避免同一秒内大小相同的修改使用旧的字节码
+    """
+    if not py_file.endswith(".py"):
+        return
+    stem = os.path.splitext(os.path.basename(py_file))[0]
+    pycache_folder = os.path.join(os.path.dirname(py_file), "__pycache__")
+    if not os.path.isdir(pycache_folder):
+        return
+    for filename in os.listdir(pycache_folder):
+        if filename.startswith(stem + ".") and filename.endswith(".pyc"):
+            os.remove(os.path.join(pycache_folder, filename))
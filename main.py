@@ -3,6 +3,7 @@
 
 import os
 from configparser import ConfigParser
+from functools import cached_property
 
 from common.class_loader.module_installer import default_blender_addon_path, normalize_blender_path_by_system
 
@@ -30,16 +31,16 @@ BLENDER_EXE_PATH = "C:/software/general/Blender/blender-3.6.0-windows-x64/blende
 # 在打包扩展时，框架会将绝对导入转换为相对导入。如果你从传统插件迁移到扩展，请确保更新config.py中的__addon_name__
 IS_EXTENSION = False
 
+# The path to install addon during testing, detected from the Blender executable if it is None.
 # You can override the default path by setting the path manually
+# 测试时插件的安装路径 为None时根据Blender可执行文件自动检测
 # 您可以通过手动设置路径来覆盖默认插件安装路径 或者在config.ini中设置
 # BLENDER_ADDON_PATH = "C:/software/general/Blender/Blender3.5/3.5/scripts/addons/"
 BLENDER_ADDON_PATH = None
-if os.path.exists(BLENDER_EXE_PATH):
-    BLENDER_ADDON_PATH = default_blender_addon_path(BLENDER_EXE_PATH)
 
 PROJECT_ROOT = os.path.abspath(os.path.dirname(__file__))
 
-# 若存在config.ini则从其中中读取配置
+# 若存在config.ini则从其中读取配置
 CONFIG_FILEPATH = os.path.join(PROJECT_ROOT, 'config.ini')
 
 # The default release dir. Must not within the current workspace
@@ -50,38 +51,95 @@ DEFAULT_RELEASE_DIR = os.path.join(PROJECT_ROOT, "../addon_release/")
 # 测试插件发布的默认目录，不能在当前工作空间内
 TEST_RELEASE_DIR = os.path.join(PROJECT_ROOT, "../addon_test/")
 
-if os.path.isfile(CONFIG_FILEPATH):
-    configParser = ConfigParser()
-    configParser.read(CONFIG_FILEPATH, encoding='utf-8')
-
-    if configParser.has_option('blender', 'exe_path'):
-        BLENDER_EXE_PATH = configParser.get('blender', 'exe_path')
-        # The path of the blender addon folder
-        # 同时更改Blender插件文件夹的路径
-        BLENDER_ADDON_PATH = default_blender_addon_path(BLENDER_EXE_PATH)
-
-    if configParser.has_option('blender', 'addon_path') and configParser.get('blender', 'addon_path'):
-        BLENDER_ADDON_PATH = configParser.get('blender', 'addon_path')
-
-    if configParser.has_option('default', 'addon') and configParser.get('default', 'addon'):
-        ACTIVE_ADDON = configParser.get('default', 'addon')
-
-    if configParser.has_option('default', 'is_extension') and configParser.get('default', 'is_extension'):
-        IS_EXTENSION = configParser.getboolean('default', 'is_extension')
-
-    if configParser.has_option('default', 'release_dir') and configParser.get('default', 'release_dir'):
-        DEFAULT_RELEASE_DIR = configParser.get('default', 'release_dir')
-
-    if configParser.has_option('default', 'test_release_dir') and configParser.get('default', 'test_release_dir'):
-        TEST_RELEASE_DIR = configParser.get('default', 'test_release_dir')
-
-BLENDER_EXE_PATH = normalize_blender_path_by_system(BLENDER_EXE_PATH)
-
-# If you want to override theBLENDER_ADDON_PATH(the path to install addon during testing), uncomment the following line and set the path manually.
-# 如果要覆盖BLENDER_ADDON_PATH(测试插件安装路径)，请取消下一行的注释并手动设置路径
-# BLENDER_ADDON_PATH = ""
-
-# Could not find the blender addon path, raise error. Please set BLENDER_ADDON_PATH manually.
-# 未找到Blender插件路径，引发错误 请手动设置BLENDER_ADDON_PATH
-if os.path.exists(BLENDER_EXE_PATH) and (not BLENDER_ADDON_PATH or not os.path.exists(BLENDER_ADDON_PATH)):
-    raise ValueError("Blender addon path not found: " + BLENDER_ADDON_PATH, "Please set the correct path in config.ini")
+# The package index (e.g. a local mirror) used to install the dependencies of the framework instead of PyPI.
+# The .whl files in the wheels folder are used as well.
+# 安装框架依赖时使用的包索引(如本地镜像)，代替PyPI 同时也会使用wheels文件夹中的whl文件
+DEPENDENCY_INDEX_URL = None
+
+# Install the dependencies of the framework only from the wheels folder or DEPENDENCY_INDEX_URL, never from PyPI
+# 仅从wheels文件夹或DEPENDENCY_INDEX_URL安装框架依赖 不访问PyPI
+OFFLINE_DEPENDENCIES = False
+
+
+class Settings:
+    """
+    The configuration actually used by the framework: the values above, overridden by config.ini. Each value is
+    resolved the first time it is read, so importing main neither reads config.ini nor runs Blender to detect the addon
+    path. Use settings.xxx instead of the values above.
+    框架实际使用的配置 即上面的配置被config.ini覆盖后的值 每个值在第一次读取时才解析
+    """
+
+    @cached_property
+    def _config(self) -> ConfigParser:
+        # 若存在config.ini则从其中读取配置
+        config = ConfigParser()
+        if os.path.isfile(CONFIG_FILEPATH):
+            config.read(CONFIG_FILEPATH, encoding='utf-8')
+        return config
+
+    def _get_option(self, section, option, default):
+        # the value in config.ini if it is set and not empty
+        if self._config.has_option(section, option) and self._config.get(section, option):
+            return self._config.get(section, option)
+        return default
+
+    @property
+    def project_root(self) -> str:
+        return PROJECT_ROOT
+
+    @cached_property
+    def active_addon(self) -> str:
+        return self._get_option('default', 'addon', ACTIVE_ADDON)
+
+    @cached_property
+    def is_extension(self) -> bool:
+        if self._config.has_option('default', 'is_extension') and self._config.get('default', 'is_extension'):
+            return self._config.getboolean('default', 'is_extension')
+        return IS_EXTENSION
+
+    @cached_property
+    def blender_exe_path(self) -> str:
+        blender_exe_path = BLENDER_EXE_PATH
+        if self._config.has_option('blender', 'exe_path'):
+            blender_exe_path = self._config.get('blender', 'exe_path')
+        return normalize_blender_path_by_system(blender_exe_path)
+
+    @cached_property
+    def blender_addon_path(self):
+        """
+        The addon folder of Blender, the addon_path of config.ini, or BLENDER_ADDON_PATH, or detected from the version
+        of the Blender executable. None if it can not be detected because the Blender executable does not exist.
+        """
+        blender_addon_path = self._get_option('blender', 'addon_path', BLENDER_ADDON_PATH)
+        if not blender_addon_path and os.path.exists(self.blender_exe_path):
+            # The path of the blender addon folder
+            # 根据Blender可执行文件的版本得到Blender插件文件夹的路径
+            blender_addon_path = default_blender_addon_path(self.blender_exe_path)
+        # Could not find the blender addon path, raise error. Please set BLENDER_ADDON_PATH manually.
+        # 未找到Blender插件路径，引发错误 请手动设置BLENDER_ADDON_PATH
+        if os.path.exists(self.blender_exe_path) and (not blender_addon_path or
+                                                      not os.path.exists(blender_addon_path)):
+            raise ValueError(f"Blender addon path not found: {blender_addon_path}",
+                             "Please set the correct path in config.ini")
+        return blender_addon_path or None
+
+    @cached_property
+    def default_release_dir(self) -> str:
+        return self._get_option('default', 'release_dir', DEFAULT_RELEASE_DIR)
+
+    @cached_property
+    def test_release_dir(self) -> str:
+        return self._get_option('default', 'test_release_dir', TEST_RELEASE_DIR)
+
+    @cached_property
+    def dependency_index_url(self):
+        return self._get_option('dependencies', 'index_url', DEPENDENCY_INDEX_URL)
+
+    @cached_property
+    def offline_dependencies(self) -> bool:
+        if self._config.has_option('dependencies', 'offline') and self._config.get('dependencies', 'offline'):
+            return self._config.getboolean('dependencies', 'offline')
+        return OFFLINE_DEPENDENCIES
+
+
+settings = Settings()
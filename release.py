@@ -1,5 +1,5 @@
-from framework import get_init_file_path, release_addon
-from main import ACTIVE_ADDON, IS_EXTENSION
+from framework import get_init_file_path, release_addon, release_addons, get_all_addon_names
+from main import settings
 
 # 发布前请修改ACTIVE_ADDON参数
 
@@ -9,17 +9,20 @@ from main import ACTIVE_ADDON, IS_EXTENSION
 
 if __name__ == '__main__':
     import argparse
+    import sys
 
     parser = argparse.ArgumentParser()
-    parser.add_argument('addon', default=ACTIVE_ADDON, nargs='?', help='addon name')
-    parser.add_argument('--is_extension', default=IS_EXTENSION, action='store_true', help='If true, package the addon '
-                                                                                          'as extension, framework '
-                                                                                          'will convert absolute '
-                                                                                          'import to relative import '
-                                                                                          'for you and will take care '
-                                                                                          'of packaging the '
-                                                                                          'extension. Default is the '
-                                                                                          'value of IS_EXTENSION')
+    parser.add_argument('addon', default=[settings.active_addon], nargs='*', help='addon name, several addons can '
+                                                                                 'be released at once')
+    parser.add_argument('--all', default=False, action='store_true', help='Release every addon under the addons '
+                                                                          'folder.')
+    parser.add_argument('--jobs', default=None, type=int, help='Number of addons released at the same time when '
+                                                               'releasing several addons. Default is decided by '
+                                                               'the number of CPUs.')
+    parser.add_argument('--is_extension', default=settings.is_extension, action='store_true',
+                        help='If true, package the addon as extension, framework will convert absolute import to '
+                             'relative import for you and will take care of packaging the extension. Default is the '
+                             'value of IS_EXTENSION')
     parser.add_argument('--disable_zip', default=False, action='store_true', help='If true, release the addon into a '
                                                                                   'plain folder and do not zip it '
                                                                                   'into an installable package, '
@@ -30,11 +33,41 @@ if __name__ == '__main__':
                                                                                    'released zip file name.')
     parser.add_argument('--with_timestamp', default=False, action='store_true', help='Append a timestamp to the zip '
                                                                                      'file name.')
+    parser.add_argument('--incremental', default=False, action='store_true', help='Reuse the previous release folder '
+                                                                                  'and only update the files that '
+                                                                                  'changed since the last release.')
+    parser.add_argument('--dependency_workers', default=1, type=int, help='Number of processes used to parse the '
+                                                                          'python files when resolving the '
+                                                                          'dependencies of the addon. Default is 1.')
+    parser.add_argument('--compress_level', default=6, type=int, choices=range(10), help='Zlib compression level '
+                                                                                         'of the zip file, from 0 '
+                                                                                         '(no compression) to 9. '
+                                                                                         'Default is 6.')
+    parser.add_argument('--tree_shaking', default=False, action='store_true', help='Only release the python files of '
+                                                                                  'the addon reachable from its '
+                                                                                  '__init__.py or from the modules '
+                                                                                  'defining classes to register, '
+                                                                                  'the excluded files are reported. '
+                                                                                  'Modules only imported dynamically '
+                                                                                  'are excluded too.')
     args = parser.parse_args()
-    release_addon(target_init_file=get_init_file_path(args.addon),
-                  addon_name=args.addon,
-                  need_zip=not args.disable_zip,
-                  is_extension=args.is_extension,
-                  with_timestamp=args.with_timestamp,
-                  with_version=args.with_version,
-                  )
+    release_args = dict(need_zip=not args.disable_zip,
+                        is_extension=args.is_extension,
+                        with_timestamp=args.with_timestamp,
+                        with_version=args.with_version,
+                        incremental=args.incremental,
+                        dependency_workers=args.dependency_workers,
+                        compress_level=args.compress_level,
+                        tree_shaking=args.tree_shaking,
+                        )
+    addons = get_all_addon_names() if args.all else args.addon
+    if len(addons) == 0:
+        sys.exit("No addon found under the addons folder")
+    if len(addons) == 1:
+        release_addon(target_init_file=get_init_file_path(addons[0]),
+                      addon_name=addons[0],
+                      **release_args)
+    else:
+        results = release_addons(addons, max_workers=args.jobs, **release_args)
+        if any(isinstance(result, Exception) for result, _ in results.values()):
+            sys.exit(1)
@@ -1,5 +1,5 @@
 from framework import test_addon
-from main import ACTIVE_ADDON
+from main import settings
 
 # 测试前请修改ACTIVE_ADDON参数
 
@@ -10,8 +10,15 @@ if __name__ == '__main__':
     import argparse
 
     parser = argparse.ArgumentParser()
-    parser.add_argument('addon', default=ACTIVE_ADDON, nargs='?', help='addon name')
+    parser.add_argument('addon', default=settings.active_addon, nargs='?', help='addon name')
     parser.add_argument('--disable_watch', default=False, action='store_true', help='Do not reload addon when file '
                                                                                     'changed')
+    parser.add_argument('--full_reload', default=False, action='store_true',
+                        help='Reload the whole addon when file changed, instead of only the changed modules and the '
+                             'modules importing them')
+    parser.add_argument('--hide_timing', default=False, action='store_true',
+                        help='Do not print how long each module import and class registration takes when the addon '
+                             'is enabled')
     args = parser.parse_args()
-    test_addon(args.addon, enable_watch=not args.disable_watch)
+    test_addon(args.addon, enable_watch=not args.disable_watch, selective_reload=not args.full_reload,
+               show_timing=not args.hide_timing)